@@ -1,8 +1,11 @@
 import argparse
 
-from scripts import create_vectordb, download_data
-
+# The chunking workers are spawned and import this module again, so the modules
+# of each command are only imported by the command that runs.
 if __name__ == "__main__":
+    from scripts.chunking import DEFAULT_WORKERS
+    from scripts.embedding_pipeline import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY
+
     parser = argparse.ArgumentParser(description="Crear base de datos vectorial")
     parser.add_argument(
         "--create", action="store_true", help="Crear la base de datos vectorial"
@@ -10,15 +13,121 @@ if __name__ == "__main__":
     parser.add_argument(
         "--download", action="store_true", help="Descargar datos desde Google Drive"
     )
+    parser.add_argument(
+        "--per-type",
+        action="store_true",
+        help="Crear además una colección por tipo de documento (usar con --create)",
+    )
+
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reconstruir la base de datos desde cero en lugar de actualizarla (usar con --create)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"Documentos por solicitud de embeddings (usar con --create, por defecto {DEFAULT_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Solicitudes de embeddings simultáneas (usar con --create, por defecto {DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"Procesos para fragmentar los documentos (usar con --create, por defecto {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--cache-report",
+        action="store_true",
+        help="Mostrar el tamaño de la caché de embeddings",
+    )
+    parser.add_argument(
+        "--cache-prune",
+        type=float,
+        metavar="DIAS",
+        help="Eliminar de la caché de embeddings los vectores no usados en los últimos DIAS días",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="store_true",
+        help="Medir la recuperación de contexto con corpus sintéticos, sin conexión",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        metavar="N",
+        help="Fragmentos de cada corpus sintético (usar con --benchmark)",
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        help="Consultas por medición (usar con --benchmark)",
+    )
+    parser.add_argument(
+        "--clients",
+        type=int,
+        help="Clientes simultáneos (usar con --benchmark)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["chroma", "numpy"],
+        default="chroma",
+        help="Backend de recuperación a medir (usar con --benchmark, por defecto chroma)",
+    )
+    parser.add_argument(
+        "--output",
+        help="Archivo JSON de resultados (usar con --benchmark)",
+    )
 
     args = parser.parse_args()
 
     if args.create:
-        vectordb = create_vectordb.create_vectordb()
+        from scripts import create_vectordb
+
+        create_vectordb.create_vectordb(
+            per_type_collections=args.per_type,
+            full_rebuild=args.full,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            workers=args.workers,
+        )
         print("Base de datos vectorial creada exitosamente.")
     elif args.download:
+        from scripts import download_data
+
         download_data.download_data()
         print("Datos descargados exitosamente.")
+    elif args.benchmark:
+        from scripts import benchmark_retrieval
+
+        options = {"sizes": args.sizes, "requests": args.requests, "clients": args.clients, "output": args.output}
+        benchmark_retrieval.benchmark_retrieval(
+            backend=args.backend,
+            per_type_collections=args.per_type,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            **{name: value for name, value in options.items() if value is not None},
+        )
+    elif args.cache_report:
+        from scripts.embedding_cache import PersistentEmbeddingCache
+
+        report = PersistentEmbeddingCache().report()
+        print(f"Caché de embeddings: {report['path']} ({report['size_bytes'] / 1024 / 1024:.1f} MB)")
+        print(f"Vectores: {report['entries']}")
+        for model, model_report in report["models"].items():
+            print(f"- {model}: {model_report['entries']} vectores, {model_report['vector_bytes'] / 1024 / 1024:.1f} MB")
+    elif args.cache_prune is not None:
+        from scripts.embedding_cache import PersistentEmbeddingCache
+
+        deleted = PersistentEmbeddingCache().prune(args.cache_prune)
+        print(f"Vectores eliminados de la caché de embeddings: {deleted}")
     else:
         print(
             "Por favor, usa --create para crear la base de datos vectorial o --download para descargar datos."
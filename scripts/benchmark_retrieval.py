@@ -0,0 +1,340 @@
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from typing import Literal
+
+import chromadb
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from scripts.embedding_pipeline import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, upsert_documents
+from scripts.type_collections import write_type_collections
+from src import ENV
+from src.agents.context_managers.chroma_cm import ChromaContextManager
+from src.consts import COLLECTION_NAME, DocType
+from src.core.agent import Agent
+
+DEFAULT_SIZES = (1_000, 10_000)
+DEFAULT_REQUESTS = 200
+DEFAULT_CLIENTS = 8
+DEFAULT_OUTPUT = "benchmarks/retrieval.json"
+DIMENSIONS = 256
+WORDS_PER_CHUNK = 40
+FAKE_ANSWER = "Según la información disponible, la respuesta es la siguiente."
+
+# Words shared by every document type, so the classification search has to rank
+# the types instead of matching disjoint vocabularies.
+COMMON_WORDS = [
+    "elecciones", "bolivia", "votar", "fecha", "información", "tribunal", "electoral", "ciudadanos",
+    "nacional", "departamento", "proceso", "registro", "mesa", "recinto", "resultado", "partido",
+]  # fmt: skip
+TYPE_WORDS = {doc_type: [f"{doc_type.value[:6]}{number:03d}" for number in range(200)] for doc_type in DocType}
+
+
+class StubEmbeddings(Embeddings):
+    """Deterministic local embeddings: a normalized bag of hashed words.
+
+    Every word is hashed into one of ``dimensions`` buckets with a sign, so texts
+    sharing words get similar vectors, the same text always gets the same vector,
+    and no request leaves the machine.
+    """
+
+    def __init__(self, dimensions: int = DIMENSIONS):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in text.lower().split():
+            digest = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            vector[digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def synthetic_documents(size: int, seed: int = 0) -> Iterator[Document]:
+    """Generate ``size`` chunks spread evenly across every document type.
+
+    Args:
+        size: Number of chunks.
+        seed: Seed of the generator; the same seed always yields the same corpus.
+
+    Yields:
+        The chunks, with IDs and the metadata the context manager reads.
+    """
+    rng = random.Random(seed)
+    doc_types = list(DocType)
+    for number in range(size):
+        doc_type = doc_types[number % len(doc_types)]
+        words = rng.choices(TYPE_WORDS[doc_type], k=WORDS_PER_CHUNK * 3 // 4)
+        words += rng.choices(COMMON_WORDS, k=WORDS_PER_CHUNK - len(words))
+        rng.shuffle(words)
+        metadata = {"type": doc_type.value}
+        if doc_type is DocType.Q_A:
+            metadata["answer"] = " ".join(rng.choices(TYPE_WORDS[doc_type], k=12))
+        yield Document(id=f"{doc_type.value}:{number}", page_content=" ".join(words), metadata=metadata)
+
+
+def synthetic_queries(count: int, seed: int = 1) -> list[str]:
+    """Generate distinct queries about random document types.
+
+    Every query ends with a unique word, so none of them is served by the query
+    embedding cache.
+    """
+    rng = random.Random(seed)
+    doc_types = list(DocType)
+    queries = []
+    for number in range(count):
+        doc_type = rng.choice(doc_types)
+        words = rng.choices(TYPE_WORDS[doc_type], k=rng.randint(3, 6)) + rng.choices(COMMON_WORDS, k=2)
+        queries.append(" ".join([*words, f"consulta{number}"]))
+    return queries
+
+
+def _rss_bytes() -> int:
+    """Return the resident memory of the process, or its peak where the current one is unavailable."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _directory_size(directory: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names
+    )
+
+
+@contextmanager
+def _overridden(section: object, **values) -> Iterator[None]:
+    """Set attributes of a settings section and restore their previous values on exit."""
+    previous = {name: getattr(section, name) for name in values}
+    for name, value in values.items():
+        setattr(section, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(section, name, value)
+
+
+def _git_commit() -> str | None:
+    result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False)
+    return result.stdout.strip() or None
+
+
+def _latency_summary(latencies: list[float]) -> dict[str, float]:
+    milliseconds = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(milliseconds, [50, 90, 99])
+    return {
+        "requests": len(latencies),
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+        "mean_ms": float(milliseconds.mean()),
+        "max_ms": float(milliseconds.max()),
+    }
+
+
+async def _measure_sequential(manager: ChromaContextManager, queries: list[str]) -> dict[str, float]:
+    latencies = []
+    for query in queries:
+        started_at = time.perf_counter()
+        await manager.retrieve_context(query, [])
+        latencies.append(time.perf_counter() - started_at)
+    return _latency_summary(latencies)
+
+
+async def _measure_concurrent(manager: ChromaContextManager, queries: list[str], clients: int) -> dict[str, float]:
+    pending = iter(queries)
+    latencies: list[float] = []
+
+    async def client() -> None:
+        for query in pending:
+            started_at = time.perf_counter()
+            await manager.retrieve_context(query, [])
+            latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    seconds = time.perf_counter() - started_at
+    return {
+        "clients": clients,
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds,
+        **_latency_summary(latencies),
+    }
+
+
+async def _measure_agent(agent: Agent, queries: list[str]) -> dict[str, float]:
+    latencies = []
+    for query in queries:
+        started_at = time.perf_counter()
+        async for _ in agent.stream(query, []):
+            pass
+        latencies.append(time.perf_counter() - started_at)
+    return _latency_summary(latencies)
+
+
+async def benchmark_size(
+    size: int,
+    directory: str,
+    requests: int,
+    clients: int,
+    per_type_collections: bool,
+    batch_size: int,
+    concurrency: int,
+) -> dict:
+    """Build a synthetic corpus of ``size`` chunks in ``directory`` and measure its retrieval.
+
+    Returns:
+        The build time, the memory and disk used by the index, the latency of
+        sequential ``retrieve_context`` calls, the throughput of ``clients``
+        concurrent callers and the latency of ``Agent.stream`` with a fake chat model.
+    """
+    embeddings = StubEmbeddings()
+    client = chromadb.PersistentClient(path=directory)
+    try:
+        batch_size = min(batch_size, client.get_max_batch_size())
+        vectordb = Chroma(client=client, collection_name=COLLECTION_NAME, embedding_function=embeddings)
+        started_at = time.perf_counter()
+        build = await upsert_documents(
+            vectordb, synthetic_documents(size), batch_size=batch_size, concurrency=concurrency
+        )
+        if per_type_collections:
+            write_type_collections(client, batch_size=batch_size)
+        build_seconds = time.perf_counter() - started_at
+    finally:
+        client.close()
+
+    with _overridden(ENV.chroma, persist_directory=directory):
+        rss_before = _rss_bytes()
+        started_at = time.perf_counter()
+        manager = ChromaContextManager(emb_model=embeddings)
+        open_seconds = time.perf_counter() - started_at
+    queries = synthetic_queries(requests * 2 + 1, seed=size)
+    try:
+        # The first query loads the lazily opened parts of the index.
+        await manager.retrieve_context(queries[-1], [])
+        index_memory = _rss_bytes() - rss_before
+        sequential = await _measure_sequential(manager, queries[:requests])
+        concurrent = await _measure_concurrent(manager, queries[requests:-1], clients)
+        agent = Agent(chat_model=FakeListChatModel(responses=[FAKE_ANSWER]), context_manager=manager)
+        agent_stream = await _measure_agent(agent, queries[: min(requests, 50)])
+    finally:
+        await manager.aclose()
+
+    return {
+        "chunks": size,
+        "build": {
+            "seconds": build_seconds,
+            "documents_per_second": build["documents"] / build_seconds,
+            "batches": build["batches"],
+        },
+        "open_seconds": open_seconds,
+        "index_memory_bytes": index_memory,
+        "disk_bytes": _directory_size(directory),
+        "retrieve_context": sequential,
+        "concurrent": concurrent,
+        "agent_stream": agent_stream,
+    }
+
+
+def benchmark_retrieval(
+    sizes: list[int] | tuple[int, ...] = DEFAULT_SIZES,
+    requests: int = DEFAULT_REQUESTS,
+    clients: int = DEFAULT_CLIENTS,
+    backend: Literal["chroma", "numpy"] = "chroma",
+    per_type_collections: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    output: str = DEFAULT_OUTPUT,
+) -> dict:
+    """Benchmark the retrieval on synthetic corpora and write the report as JSON.
+
+    Each corpus is built in a temporary directory with deterministic stub embeddings
+    and a fake chat model, so two runs on the same machine compare the code, not the
+    providers. The history is still trimmed with the real tiktoken encoding, as in
+    production, so it must be in the tiktoken cache for the run to be offline; the
+    first run downloads it otherwise. The retrieval settings are restored on return.
+
+    Args:
+        sizes: Number of chunks of each corpus.
+        requests: Number of queries of each measurement.
+        clients: Number of concurrent callers of the throughput measurement.
+        backend: Retrieval backend, as ``RETRIEVAL_BACKEND``.
+        per_type_collections: Also write and search one collection per document type.
+        batch_size: Documents per embedding batch of the build.
+        concurrency: Embedding batches in flight during the build.
+        output: Path of the JSON report.
+
+    Returns:
+        The report.
+    """
+    results = []
+    for size in sizes:
+        with (
+            _overridden(ENV.retrieval, backend=backend, per_type_collections=per_type_collections),
+            tempfile.TemporaryDirectory(prefix="benchmark-retrieval-") as directory,
+        ):
+            result = asyncio.run(
+                benchmark_size(size, directory, requests, clients, per_type_collections, batch_size, concurrency)
+            )
+        results.append(result)
+        print(
+            f"{size} fragmentos: construcción {result['build']['seconds']:.2f}s, "
+            f"memoria {result['index_memory_bytes'] / 1024 / 1024:.1f} MB, "
+            f"disco {result['disk_bytes'] / 1024 / 1024:.1f} MB"
+        )
+        print(
+            "  retrieve_context: p50 {p50_ms:.1f} ms, p90 {p90_ms:.1f} ms, p99 {p99_ms:.1f} ms".format(
+                **result["retrieve_context"]
+            )
+        )
+        print(
+            "  {clients} clientes simultáneos: {requests_per_second:.1f} consultas/s, p99 {p99_ms:.1f} ms".format(
+                **result["concurrent"]
+            )
+        )
+
+    report = {
+        "created_at": datetime.now(UTC).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {
+            "backend": backend,
+            "per_type_collections": per_type_collections,
+            "faq_index": ENV.retrieval.faq_index,
+            "requests": requests,
+            "clients": clients,
+            "batch_size": batch_size,
+            "concurrency": concurrency,
+            "dimensions": DIMENSIONS,
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Resultados guardados en: {output}")
+    return report
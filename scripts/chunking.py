@@ -0,0 +1,109 @@
+import multiprocessing
+import os
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import cache
+from itertools import batched
+from typing import TypeVar
+
+import tiktoken
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+T = TypeVar("T")
+
+# Every worker loads its own splitter and tiktoken encoding, so more workers than
+# this rarely pay off for the size of the base data file.
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+WINDOW_SIZE = 256
+
+
+@cache
+def get_splitter() -> RecursiveCharacterTextSplitter:
+    """Build the text splitter once per process, with its own tiktoken encoding."""
+    encoding = tiktoken.encoding_for_model("text-embedding-3-small")
+    return RecursiveCharacterTextSplitter(
+        chunk_size=150,
+        chunk_overlap=20,
+        length_function=lambda text: len(encoding.encode(text)),
+        separators=["\n\n", "\n", ". ", " ", ""],
+    )
+
+
+def split_text(text: str) -> list[str]:
+    return get_splitter().split_text(text)
+
+
+class Chunker:
+    """Split texts into chunks, spread over a process pool when more than one worker is used.
+
+    Items are processed in windows of ``window_size``, so the input can be a stream and
+    only one window is held in memory at a time. Output keeps the input order.
+
+    Attributes:
+        workers: Number of worker processes; 1 splits in the current process.
+        split_function: Module-level function that splits one text; each worker builds
+            and caches its own splitter on first use.
+        chunks: Number of chunks produced so far.
+        seconds: Time spent splitting so far.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        window_size: int = WINDOW_SIZE,
+        split_function: Callable[[str], list[str]] = split_text,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.split_function = split_function
+        self.window_size = window_size
+        self.chunks = 0
+        self.seconds = 0.0
+        self._executor: ProcessPoolExecutor | None = None
+        if workers > 1:
+            # Workers are spawned, not forked, so they never inherit the threads of the
+            # embedding pipeline. A spawned worker imports the ``__main__`` module again
+            # before this one, so entry points keep their heavy imports out of the top level.
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def __enter__(self) -> "Chunker":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds > 0 else 0.0
+
+    def split(self, items: Iterable[T], text_of: Callable[[T], str]) -> Iterator[tuple[T, list[str]]]:
+        """Split the text of each item into chunks.
+
+        Args:
+            items: The items to split.
+            text_of: Returns the text of an item; called in the current process.
+
+        Yields:
+            Each item with the chunks of its text, in input order.
+        """
+        for window in batched(items, self.window_size):
+            texts = [text_of(item) for item in window]
+            started_at = time.perf_counter()
+            if self._executor is None:
+                results = [self.split_function(text) for text in texts]
+            else:
+                chunksize = max(1, len(texts) // (self.workers * 4))
+                results = list(self._executor.map(self.split_function, texts, chunksize=chunksize))
+            self.seconds += time.perf_counter() - started_at
+            self.chunks += sum(len(chunks) for chunks in results)
+            yield from zip(window, results)
@@ -1,31 +1,49 @@
+import asyncio
+import hashlib
 import json
 import os
 import re
+import shutil
+import time
+from collections.abc import Callable, Iterable, Iterator
+from operator import itemgetter
 
-import tiktoken
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import chromadb
 from langchain_chroma import Chroma
-from langchain_community.document_loaders import JSONLoader
 from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
 
-from src.consts import DocType
+from scripts.chunking import DEFAULT_WORKERS, Chunker
+from scripts.embedding_cache import PersistentCachedEmbeddings, PersistentEmbeddingCache
+from scripts.embedding_pipeline import DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, upsert_documents
+from scripts.json_stream import iter_sections
+from scripts.type_collections import delete_type_collections, write_type_collections
+from src.agents.vector_stores.versions import (
+    COMPLETE_FILE,
+    CURRENT_FILE,
+    VERSIONS_DIRECTORY,
+    new_version_directory,
+    prune_versions,
+    publish_version,
+    resolve_directory,
+)
+from src.consts import COLLECTION_NAME, DocType
 from src.settings import Settings
 
 settings = Settings(_env_file=".env")
 
 folder = "base_file"
+# Number of versions of the vector database kept on disk, the published one included.
+KEEP_VERSIONS = 3
 file_path = f"{folder}/{settings.google.data_filename}"
-embedding = OpenAIEmbeddings(
-    model=settings.llm.emb_model,
-    api_key=settings.llm.api_key,
-)
-encoding = tiktoken.encoding_for_model("text-embedding-3-small")
-splitter = RecursiveCharacterTextSplitter(
-    chunk_size=150,
-    chunk_overlap=20,
-    length_function=lambda text: len(encoding.encode(text)),
-    separators=["\n\n", "\n", ". ", " ", ""],
+embedding_cache = PersistentEmbeddingCache()
+embedding = PersistentCachedEmbeddings(
+    OpenAIEmbeddings(
+        model=settings.llm.emb_model,
+        api_key=settings.llm.api_key,
+    ),
+    cache=embedding_cache,
+    model_name=settings.llm.emb_model,
 )
 
 
@@ -34,82 +52,89 @@ def clean_text(text: str) -> str:
     return text
 
 
-def load_verifications():
+def document_id(doc_type: DocType, source_key: str, chunk_index: int = 0) -> str:
+    """Build a stable document ID from its source record and position within it."""
+    digest = hashlib.sha1(f"{source_key}\x1f{chunk_index}".encode()).hexdigest()[:20]
+    return f"{doc_type.value}:{digest}"
+
+
+def content_hash(document: Document) -> str:
+    """Hash the content and metadata of a document to detect changes between builds."""
+    metadata = {key: value for key, value in document.metadata.items() if key != "content_hash"}
+    payload = json.dumps([document.page_content, metadata], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def record_key(record: dict) -> str:
+    """Return the key that identifies a source record across data refreshes."""
+    for field in ("id", "url", "title"):
+        if record.get(field):
+            return str(record[field])
+    return json.dumps(record, sort_keys=True, ensure_ascii=False)
+
+
+def load_verifications(records: Iterable[dict], chunker: Chunker) -> Iterator[Document]:
     print("Cargando verificaciones...")
-    loader = JSONLoader(
-        file_path=file_path,
-        jq_schema=".verifications[]",
-        text_content=False,
-    )
-    documents = loader.load()
-    splitted_documents = []
-    for document in documents:
-        page_content = json.loads(document.page_content)
-        chunks = splitter.split_text(page_content["body"])
-        for chunk in chunks:
-            metadata = {
-                **page_content,
-                "tags": " ".join(page_content["tags"]),
-                "type": DocType.VERIFICATIONS.value,
-            }
-            del metadata["body"]
-            splitted_document = Document(page_content=clean_text(chunk), metadata=metadata)
-            splitted_documents.append(splitted_document)
-    print(f"Verificaciones cargadas: {len(splitted_documents)} documentos")
-    return splitted_documents
-
-
-def load_government_programs():
+    count = 0
+    for record, chunks in chunker.split(records, itemgetter("body")):
+        source_key = record_key(record)
+        metadata = {
+            **record,
+            "tags": " ".join(record["tags"]),
+            "type": DocType.VERIFICATIONS.value,
+        }
+        del metadata["body"]
+        for index, chunk in enumerate(chunks):
+            count += 1
+            yield Document(
+                id=document_id(DocType.VERIFICATIONS, source_key, index),
+                page_content=clean_text(chunk),
+                metadata=dict(metadata),
+            )
+    print(f"Verificaciones cargadas: {count} documentos")
+
+
+def load_government_programs(records: Iterable[dict], chunker: Chunker) -> Iterator[Document]:
     print("Cargando programas gubernamentales...")
-    loader = JSONLoader(
-        file_path=file_path,
-        jq_schema=".government_programs[]",
-        text_content=False,
+    count = 0
+    plan_sections = (
+        (program, index, key, value)
+        for program in records
+        for index, (key, value) in enumerate(program["government_plan"].items())
     )
-    documents = loader.load()
-    splitted_documents = []
-    for document in documents:
-        program = json.loads(document.page_content)  # type: ignore
+    for (program, index, key, value), chunks in chunker.split(
+        plan_sections, lambda plan_section: str(plan_section[3].get("summary", ""))
+    ):
         party = program["party"]
         sigla = program["sigla"]
         president = program["president"]
         vice_president = program["vice_president"]
-        government_plan = program["government_plan"]
-        for index, (key, value) in enumerate(government_plan.items()):
-            title = str(key).replace("_", " ")
-            summary = str(value.get("summary", ""))
-            _ = str(value.get("content", ""))
-            num_seq = index + 1
-            metadata = {"num_seq": num_seq, "type": DocType.GOV_PROGRAMS.value}
-            chunks = splitter.split_text(summary)
-            for chunk in chunks:
-                page_content = "\n".join(
-                    [
-                        f"Plan de gobierno del Presidente {president} "
-                        + f"y vice-presidente {vice_president} "
-                        + f"del partido {party} ({sigla})",
-                        f"{title} parte {num_seq}",
-                        chunk,
-                    ]
-                )
-                splitted_document = Document(page_content=page_content.lower(), metadata=metadata)
-                splitted_documents.append(splitted_document)
-
-    print(f"Programas gubernamentales cargados: {len(splitted_documents)} documentos")
-    return splitted_documents
+        title = str(key).replace("_", " ")
+        num_seq = index + 1
+        metadata = {"num_seq": num_seq, "type": DocType.GOV_PROGRAMS.value}
+        for chunk_index, chunk in enumerate(chunks):
+            page_content = "\n".join(
+                [
+                    f"Plan de gobierno del Presidente {president} "
+                    + f"y vice-presidente {vice_president} "
+                    + f"del partido {party} ({sigla})",
+                    f"{title} parte {num_seq}",
+                    chunk,
+                ]
+            )
+            count += 1
+            yield Document(
+                id=document_id(DocType.GOV_PROGRAMS, f"{sigla}\x1f{key}", chunk_index),
+                page_content=page_content.lower(),
+                metadata=dict(metadata),
+            )
+    print(f"Programas gubernamentales cargados: {count} documentos")
 
 
-def load_calendar_metadata():
+def load_calendar_metadata(records: Iterable[dict], chunker: Chunker) -> Iterator[Document]:
     print("Cargando metadatos del calendario...")
-    loader = JSONLoader(
-        file_path=file_path,
-        jq_schema=".calendar_metadata",
-        text_content=False,
-    )
-    documents = loader.load()
-    splitted_documents = []
-    for document in documents:
-        page_content = json.loads(document.page_content)
+    count = 0
+    for page_content in records:
         content = "Titulo {}\n\nFecha {}\nResolución {}\n\nFirmas \n\n{}".format(
             page_content["title"],
             page_content["date"],
@@ -117,27 +142,19 @@ def load_calendar_metadata():
             "\n".join([f"{signature['name']} - {signature['position']}" for signature in page_content["signatories"]]),
         )
         content = clean_text(content).lower()
-        splitted_documents.append(
-            Document(
-                page_content=content,
-                metadata={"type": DocType.CALENDAR_META.value},
-            )
+        count += 1
+        yield Document(
+            id=document_id(DocType.CALENDAR_META, "calendar_metadata"),
+            page_content=content,
+            metadata={"type": DocType.CALENDAR_META.value},
         )
-    print(f"Metadatos del calendario cargados: {len(splitted_documents)} documentos")
-    return splitted_documents
+    print(f"Metadatos del calendario cargados: {count} documentos")
 
 
-def load_calendar():
+def load_calendar(records: Iterable[dict], chunker: Chunker) -> Iterator[Document]:
     print("Cargando calendario...")
-    loader = JSONLoader(
-        file_path=file_path,
-        jq_schema=".calendar[]",
-        text_content=False,
-    )
-    documents = loader.load()
-    splitted_documents = []
-    for document in documents:
-        page_content = json.loads(document.page_content)
+    count = 0
+    for page_content in records:
         content = """Escenario Nro. {no} - {scenario}
 Actividad - {activity}
 Duración - {days} día(s) antes o después del dia de las elecciones (17 de agosto 2025)
@@ -149,97 +166,260 @@ Referencia - {reference}
             clean_text(content).lower()
             + "Fuente - [calendario de elecciones generales 2025](https://fuentedirecta.oep.org.bo/noticia/el-tse-aprueba-el-calendario-electoral-para-las-elecciones-generales-2025)"
         )
-        splitted_documents.append(
-            Document(
-                page_content=content,
-                metadata={"type": DocType.CALENDAR.value},
-            )
+        count += 1
+        yield Document(
+            id=document_id(DocType.CALENDAR, f"{page_content['no']}\x1f{page_content['activity']}"),
+            page_content=content,
+            metadata={"type": DocType.CALENDAR.value},
         )
-    print(f"Calendario cargado: {len(splitted_documents)} documentos")
-    return splitted_documents
+    print(f"Calendario cargado: {count} documentos")
 
 
-def load_candidates():
-    with open(file_path, "r") as f:
-        database = json.load(f)
-    candidates: list = database["candidates"]
+def load_candidates(records: Iterable[dict], chunker: Chunker) -> Iterator[Document]:
     header = "CANDIDATURAS\n"
     header += "Lista de candidatos a la elecciones presidenciales de bolivia (2025-2030)"
     candidates_list = ""
     candidates_list_with_summary = ""
-    splitted_documents: list[Document] = []
-    for candidate in candidates:
+    for candidate in records:
         candidates_list += f"- {candidate['candidate']}\n"
         candidates_list_with_summary += f"{candidates_list}{candidate['summary']}\n"
+    [(_, chunks), (_, chunks_with_summary)] = chunker.split([candidates_list, candidates_list_with_summary], str)
 
-    chunks = splitter.split_text(candidates_list)
     for index, chuck in enumerate(chunks):
         num_seq = index + 1
         page_content = f"{header} Parte {num_seq}\n{chuck} "
-        splitted_document = Document(
+        yield Document(
+            id=document_id(DocType.CANDIDATES, "candidates", index),
             page_content=page_content.lower(),
             metadata={
                 "num_seq": num_seq,
                 "type": DocType.CANDIDATES.value,
             },
         )
-        splitted_documents.append(splitted_document)
-    chunks = splitter.split_text(candidates_list_with_summary)
-    for index, chuck in enumerate(chunks):
+    for index, chuck in enumerate(chunks_with_summary):
         num_seq = index + 1
         page_content = f"{header} y resumen de propuestas Parte {num_seq}\n{chuck} "
-        splitted_document = Document(
+        yield Document(
+            id=document_id(DocType.CANDIDATES, "candidates_with_summary", index),
             page_content=page_content.lower(),
             metadata={
                 "num_seq": num_seq,
                 "type": DocType.CANDIDATES.value,
             },
         )
-        splitted_documents.append(splitted_document)
-    return splitted_documents
 
 
-def load_questions_and_answers():
-    loader = JSONLoader(file_path=file_path, jq_schema=".questions_and_answers[]", text_content=False)
-    documents = loader.load()
-
-    def parse(document: Document):
-        content: dict = json.loads(document.page_content)
+def load_questions_and_answers(records: Iterable[dict], chunker: Chunker) -> Iterator[Document]:
+    for content in records:
         question = content["question"].strip().lower()
         answer = content["answer"]
-        return Document(page_content=question, metadata={"type": DocType.Q_A.value, "answer": answer})
-
-    return [parse(doc) for doc in documents]
-
-
-def create_vectordb():
-    verifications_docs = load_verifications()
-    government_programs_docs = load_government_programs()
-    calendar_metadata = load_calendar_metadata()
-    calendar_docs = load_calendar()
-    candidate_docs = load_candidates()
-    questions_and_answers_docs = load_questions_and_answers()
-
-    all_documents = [
-        *verifications_docs,
-        *government_programs_docs,
-        *calendar_metadata,
-        *calendar_docs,
-        *candidate_docs,
-        *questions_and_answers_docs,
-    ]
-
-    if os.path.exists(settings.chroma.persist_directory):
-        vectordb = Chroma(
-            persist_directory=settings.chroma.persist_directory,
-            embedding_function=embedding,
+        yield Document(
+            id=document_id(DocType.Q_A, question),
+            page_content=question,
+            metadata={"type": DocType.Q_A.value, "answer": answer},
         )
-        vectordb.delete_collection()
-    vectordb = Chroma.from_documents(
-        documents=all_documents,
-        embedding=embedding,
-        persist_directory=settings.chroma.persist_directory,
+
+
+SECTION_LOADERS: dict[str, Callable[[Iterable[dict], Chunker], Iterator[Document]]] = {
+    "verifications": load_verifications,
+    "government_programs": load_government_programs,
+    "calendar_metadata": load_calendar_metadata,
+    "calendar": load_calendar,
+    "candidates": load_candidates,
+    "questions_and_answers": load_questions_and_answers,
+}
+
+
+def load_documents(chunker: Chunker, path: str = file_path) -> Iterator[Document]:
+    """Read the base data file in a single streaming pass and yield the documents of every section.
+
+    Records are handed to the loader of their top-level section as they are decoded,
+    so neither the file nor the documents are ever held in memory all at once.
+    """
+    for section, records in iter_sections(path):
+        loader = SECTION_LOADERS.get(section)
+        if loader is None:
+            for _ in records:
+                pass
+            continue
+        yield from loader(records, chunker)
+
+
+def deduplicate_ids(documents: Iterable[Document]) -> Iterator[Document]:
+    """Make document IDs unique when two source records share the same key."""
+    seen: dict[str, int] = {}
+    for document in documents:
+        document_key = str(document.id)
+        occurrences = seen.get(document_key, 0)
+        seen[document_key] = occurrences + 1
+        if occurrences:
+            document.id = f"{document_key}:{occurrences}"
+        yield document
+
+
+def reset_on_model_change(client: chromadb.ClientAPI, emb_model: str) -> bool:
+    """Delete the collections embedded with another model, so every document is embedded again.
+
+    The content hashes only tell whether a document changed, not which model embedded
+    it, so the model is stored in the metadata of the mixed collection. Collections
+    without it come from builds that did not record it and are rebuilt as well.
+
+    Returns:
+        True if the collections were deleted.
+    """
+    collections = {collection.name: collection for collection in client.list_collections()}
+    if COLLECTION_NAME not in collections:
+        return False
+    previous = (collections[COLLECTION_NAME].metadata or {}).get("emb_model")
+    if previous == emb_model:
+        return False
+    print(f"Modelo de embeddings cambiado ({previous} -> {emb_model}): se recalculan todos los documentos")
+    client.delete_collection(COLLECTION_NAME)
+    delete_type_collections(client)
+    return True
+
+
+def stored_content_hashes(vectordb: Chroma, batch_size: int = DEFAULT_BATCH_SIZE) -> dict[str, str | None]:
+    """Map the ID of every stored document to its content hash, reading one page at a time.
+
+    Only the hashes are kept, so memory grows with the number of documents but not with
+    the size of their metadata.
+    """
+    hashes: dict[str, str | None] = {}
+    while True:
+        page = vectordb.get(limit=batch_size, offset=len(hashes), include=["metadatas"])
+        if not page["ids"]:
+            return hashes
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            hashes[doc_id] = (metadata or {}).get("content_hash")
+
+
+def sync_documents(
+    vectordb: Chroma,
+    documents: Iterable[Document],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, float]:
+    """Embed and upsert only new or changed documents and delete the removed ones.
+
+    Documents are consumed as a stream: only their IDs are kept once they have been
+    compared with the collection, and changed ones are embedded batch by batch.
+
+    Args:
+        vectordb: The collection to update.
+        documents: Every document of the new build, with stable IDs.
+        batch_size: Number of documents per embedding request and per deletion; at most
+            the maximum batch size of the Chroma client.
+        concurrency: Maximum number of embedding requests in flight.
+
+    Returns:
+        The number of added, updated, deleted and unchanged documents, and the
+        embedding throughput report of ``upsert_documents``.
+    """
+    existing_hashes = stored_content_hashes(vectordb, batch_size)
+    counts = {"added": 0, "updated": 0, "unchanged": 0}
+    new_ids: set[str] = set()
+
+    def changed_documents() -> Iterator[Document]:
+        for document in documents:
+            new_ids.add(str(document.id))
+            document.metadata["content_hash"] = content_hash(document)
+            if document.id not in existing_hashes:
+                counts["added"] += 1
+                yield document
+            elif existing_hashes[document.id] != document.metadata["content_hash"]:
+                counts["updated"] += 1
+                yield document
+            else:
+                counts["unchanged"] += 1
+
+    throughput = asyncio.run(
+        upsert_documents(vectordb, changed_documents(), batch_size=batch_size, concurrency=concurrency)
     )
+    deleted = [doc_id for doc_id in existing_hashes if doc_id not in new_ids]
+    for start in range(0, len(deleted), batch_size):
+        vectordb.delete(ids=deleted[start : start + batch_size])
+
+    return {**throughput, **counts, "deleted": len(deleted)}
+
+
+def create_vectordb(
+    per_type_collections: bool = False,
+    full_rebuild: bool = False,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    workers: int = DEFAULT_WORKERS,
+) -> str:
+    """Build a new version of the vector database and publish it.
 
-    print(f"Base de datos vectorial creada y persistida en: {settings.chroma.persist_directory}")
-    return vectordb
+    The build is written to a fresh directory under ``CHROMA_PERSIST_DIRECTORY``,
+    seeded with a copy of the published version unless ``full_rebuild`` is set, and
+    only then published, so running servers keep serving the previous version until
+    they switch to the new one. The copy is discarded when it was embedded with a
+    model other than ``LLM_EMB_MODEL``.
+
+    Returns:
+        The directory of the published version.
+    """
+    started_at = time.perf_counter()
+    root = settings.chroma.persist_directory
+    source = resolve_directory(root)
+    directory = new_version_directory(root)
+    try:
+        if not full_rebuild and os.path.exists(os.path.join(source, "chroma.sqlite3")):
+            shutil.copytree(
+                source,
+                directory,
+                dirs_exist_ok=True,
+                ignore=shutil.ignore_patterns(VERSIONS_DIRECTORY, f"{CURRENT_FILE}*", COMPLETE_FILE),
+            )
+        client = chromadb.PersistentClient(path=directory)
+        try:
+            batch_size = min(batch_size, client.get_max_batch_size())
+            reset_on_model_change(client, settings.llm.emb_model)
+            vectordb = Chroma(
+                client=client,
+                collection_name=COLLECTION_NAME,
+                embedding_function=embedding,
+                collection_metadata={"emb_model": settings.llm.emb_model},
+            )
+            with Chunker(workers) as chunker:
+                summary = sync_documents(
+                    vectordb, deduplicate_ids(load_documents(chunker)), batch_size=batch_size, concurrency=concurrency
+                )
+            synced_at = time.perf_counter()
+
+            if per_type_collections:
+                write_type_collections(client, batch_size=batch_size)
+            else:
+                delete_type_collections(client)
+        finally:
+            client.close()
+        publish_version(root, directory)
+    except BaseException:
+        # A failed build is never published, so its directory is of no use.
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    prune_versions(root, keep=KEEP_VERSIONS)
+    finished_at = time.perf_counter()
+
+    print(
+        "Resumen: {added} agregados, {updated} actualizados, {deleted} eliminados, {unchanged} sin cambios".format(
+            **summary
+        )
+    )
+    print(
+        f"Fragmentación: {chunker.chunks} fragmentos en {chunker.seconds:.2f}s, "
+        f"{chunker.chunks_per_second:.1f} fragmentos/s con {workers} proceso(s)"
+    )
+    print(
+        "Embeddings: {documents} documentos en {batches} lotes, {seconds:.2f}s, "
+        "{documents_per_second:.1f} documentos/s, {retries} reintentos por límite de tasa".format(**summary)
+    )
+    print(
+        f"Tiempos: carga y sincronización {synced_at - started_at:.2f}s, "
+        f"colecciones por tipo {finished_at - synced_at:.2f}s, total {finished_at - started_at:.2f}s"
+    )
+    print(f"Caché de embeddings: {embedding_cache.hits} reutilizados, {embedding_cache.misses} calculados")
+    print(f"Base de datos vectorial creada y publicada en: {directory}")
+    return directory
@@ -0,0 +1,161 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+CACHE_PATH = ".cache/embeddings.sqlite3"
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+class PersistentEmbeddingCache:
+    """On-disk SQLite cache of document embeddings, keyed by model and text hash.
+
+    Vectors are stored as float32 blobs, the same precision Chroma keeps, so a
+    cached vector produces exactly the same index as a freshly embedded one.
+
+    Attributes:
+        path: Location of the SQLite database.
+        hits: Number of texts served from the cache.
+        misses: Number of texts that had to be embedded.
+    """
+
+    def __init__(self, path: str = CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._connection: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )"""
+            )
+        return self._connection
+
+    @staticmethod
+    def make_key(model: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model}\0{text}".encode()).digest()
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Return the cached vector of each text, or None when it is not cached."""
+        keys = [self.make_key(model, text) for text in texts]
+        found: dict[bytes, list[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update((key, array("f", vector).tolist()) for key, vector in rows)
+            if found:
+                self.connection.executemany(
+                    "UPDATE embeddings SET last_used_at = ? WHERE key = ?",
+                    [(time.time(), key) for key in found],
+                )
+                self.connection.commit()
+            vectors = [found.get(key) for key in keys]
+            self.hits += sum(vector is not None for vector in vectors)
+            self.misses += sum(vector is None for vector in vectors)
+        return vectors
+
+    def put_many(self, model: str, texts: list[str], vectors: list[list[float]]) -> None:
+        """Store the vectors of a list of texts."""
+        now = time.time()
+        with self._lock:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (self.make_key(model, text), model, array("f", vector).tobytes(), now, now)
+                    for text, vector in zip(texts, vectors)
+                ],
+            )
+            self.connection.commit()
+
+    def report(self) -> dict:
+        """Return the number of cached vectors per model and the size of the database."""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT model, COUNT(*), SUM(LENGTH(vector)) FROM embeddings GROUP BY model"
+            ).fetchall()
+        return {
+            "path": self.path,
+            "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "entries": sum(count for _, count, _ in rows),
+            "models": {model: {"entries": count, "vector_bytes": size or 0} for model, count, size in rows},
+        }
+
+    def prune(self, max_age_days: float) -> int:
+        """Delete the vectors not used in the last ``max_age_days`` days and compact the database.
+
+        Args:
+            max_age_days: Age, in days since last use, above which vectors are deleted.
+
+        Returns:
+            The number of deleted vectors.
+        """
+        cutoff = time.time() - max_age_days * SECONDS_PER_DAY
+        with self._lock:
+            cursor = self.connection.execute("DELETE FROM embeddings WHERE last_used_at < ?", (cutoff,))
+            self.connection.commit()
+            self.connection.execute("VACUUM")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class PersistentCachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends texts missing from the on-disk cache to the model.
+
+    Attributes:
+        embeddings: The wrapped embedding model.
+        cache: The persistent cache.
+        model_name: Name of the embedding model, part of every cache key.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: PersistentEmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            embedded = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(self.model_name, missing, list(embedded.values()))
+            vectors = [vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)]
+        return vectors  # type: ignore[return-value]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = await asyncio.to_thread(self.cache.get_many, self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            embedded = dict(zip(missing, await self.embeddings.aembed_documents(missing)))
+            await asyncio.to_thread(self.cache.put_many, self.model_name, missing, list(embedded.values()))
+            vectors = [vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)]
+        return vectors  # type: ignore[return-value]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
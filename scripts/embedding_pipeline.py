@@ -0,0 +1,123 @@
+import asyncio
+import random
+import time
+from collections.abc import Iterable
+from itertools import batched
+
+import openai
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 4
+MAX_RETRIES = 6
+MAX_BACKOFF = 60.0
+
+
+async def embed_with_backoff(
+    embeddings: Embeddings,
+    texts: list[str],
+    max_retries: int = MAX_RETRIES,
+    base_delay: float = 1.0,
+) -> tuple[list[list[float]], int]:
+    """Embed a batch of texts, retrying with jittered exponential backoff on rate limits.
+
+    Args:
+        embeddings: The embedding model.
+        texts: The texts to embed.
+        max_retries: Number of retries before the rate limit error is raised.
+        base_delay: Seconds to wait before the first retry; doubled after each one.
+
+    Returns:
+        The vectors of the texts and the number of retries that were needed.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await embeddings.aembed_documents(texts), attempt
+        except openai.RateLimitError:
+            if attempt == max_retries:
+                raise
+            delay = min(MAX_BACKOFF, base_delay * 2**attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+async def upsert_documents(
+    vectordb: Chroma,
+    documents: Iterable[Document],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_retries: int = MAX_RETRIES,
+    base_delay: float = 1.0,
+) -> dict[str, float]:
+    """Embed documents in concurrent batches and upsert each batch as soon as it is embedded.
+
+    Documents are pulled from ``documents`` one batch at a time in a worker thread, so
+    producing them does not block the requests in flight, and at most ``concurrency``
+    batches are held in memory, being embedded or written, at any time. A failed build
+    deletes its version directory, so only the embeddings already stored in the SQLite
+    cache survive it and are reused by the next build.
+
+    Args:
+        vectordb: The collection to write to; its embedding function is used.
+        documents: The documents to embed, with IDs. May be a generator.
+        batch_size: Number of documents per embedding request; at most the maximum
+            batch size of the Chroma client.
+        concurrency: Maximum number of batches in flight.
+        max_retries: Retries per batch on rate limit errors.
+        base_delay: Seconds to wait before the first retry of a batch.
+
+    Returns:
+        The number of documents, batches and retries, the elapsed seconds and the
+        throughput in documents per second.
+    """
+    if batch_size < 1 or concurrency < 1:
+        raise ValueError("batch_size and concurrency must be at least 1")
+    if vectordb.embeddings is None:
+        raise ValueError("The vector store has no embedding function")
+    embeddings = vectordb.embeddings
+    batches = batched(documents, batch_size)
+    slots = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    report = {"documents": 0, "batches": 0, "retries": 0}
+
+    async def process(batch: tuple[Document, ...]) -> None:
+        try:
+            vectors, retries = await embed_with_backoff(
+                embeddings, [document.page_content for document in batch], max_retries, base_delay
+            )
+            report["retries"] += retries
+            async with write_lock:
+                await asyncio.to_thread(
+                    vectordb._collection.upsert,
+                    ids=[str(document.id) for document in batch],
+                    embeddings=vectors,  # type: ignore[arg-type]
+                    documents=[document.page_content for document in batch],
+                    metadatas=[document.metadata for document in batch],
+                )
+        finally:
+            slots.release()
+
+    started_at = time.perf_counter()
+    tasks: set[asyncio.Task] = set()
+    while True:
+        await slots.acquire()
+        for task in [task for task in tasks if task.done()]:
+            tasks.discard(task)
+            task.result()
+        batch = await asyncio.to_thread(next, batches, None)
+        if batch is None:
+            slots.release()
+            break
+        report["documents"] += len(batch)
+        report["batches"] += 1
+        tasks.add(asyncio.create_task(process(batch)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started_at
+    return {
+        **report,
+        "seconds": elapsed,
+        "documents_per_second": report["documents"] / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,109 @@
+import json
+from collections.abc import Iterator
+from itertools import groupby
+from operator import itemgetter
+from typing import IO, Any
+
+WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Incremental reader that decodes JSON values from a text file without loading it whole."""
+
+    def __init__(self, file: IO[str], chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, or an empty string at the end of the file."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.position} of the JSON stream")
+        self.position += 1
+
+    def decode(self) -> Any:
+        """Decode the next complete JSON value, reading more of the file as needed."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.position = end
+            return value
+
+
+def iter_records(path: str, chunk_size: int = 1 << 16) -> Iterator[tuple[str, Any]]:
+    """Stream the top-level sections of a JSON object file in a single pass.
+
+    Each element of a top-level array is yielded as its own ``(section, record)``
+    pair as soon as it is decoded; any other top-level value is yielded once.
+
+    Args:
+        path: Path of a file holding a JSON object.
+        chunk_size: Number of characters read from the file at a time.
+
+    Yields:
+        The section name and one record of that section.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        reader = _Reader(file, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            section = reader.decode()
+            reader.expect(":")
+            if reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield section, reader.decode()
+                        if reader.peek() == "]":
+                            reader.expect("]")
+                            break
+                        reader.expect(",")
+            else:
+                yield section, reader.decode()
+            if reader.peek() == "}":
+                return
+            reader.expect(",")
+
+
+def iter_sections(path: str, chunk_size: int = 1 << 16) -> Iterator[tuple[str, Iterator[Any]]]:
+    """Group the records of ``iter_records`` by section, lazily.
+
+    Each section iterator must be consumed, or skipped, before the next one is read.
+    """
+    for section, records in groupby(iter_records(path, chunk_size), key=itemgetter(0)):
+        yield section, map(itemgetter(1), records)
@@ -0,0 +1,46 @@
+import chromadb
+
+from scripts.embedding_pipeline import DEFAULT_BATCH_SIZE
+from src.consts import COLLECTION_NAME, DocType, type_collection_name
+
+
+def delete_type_collections(client: chromadb.ClientAPI):
+    """Delete the per-type collections, so the server never routes to stale copies."""
+    existing = {collection.name for collection in client.list_collections()}
+    for doc_type in DocType:
+        if type_collection_name(doc_type) in existing:
+            client.delete_collection(type_collection_name(doc_type))
+
+
+def write_type_collections(client: chromadb.ClientAPI, batch_size: int = DEFAULT_BATCH_SIZE):
+    """Copy the documents of each type, with their embeddings, into one collection per type.
+
+    The mixed collection is still used to classify queries; typed searches go straight
+    to these smaller collections instead of filtering the mixed one. Documents are read
+    and written one page of ``batch_size`` at a time, so memory stays bounded however
+    large a type is.
+    """
+    mixed = client.get_collection(COLLECTION_NAME)
+    batch_size = min(batch_size, client.get_max_batch_size())
+    delete_type_collections(client)
+    for doc_type in DocType:
+        name = type_collection_name(doc_type)
+        collection = client.create_collection(name, configuration=mixed.configuration)
+        copied = 0
+        while True:
+            page = mixed.get(
+                where={"type": doc_type.value},
+                limit=batch_size,
+                offset=copied,
+                include=["embeddings", "documents", "metadatas"],
+            )
+            if not page["ids"]:
+                break
+            collection.add(
+                ids=page["ids"],
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+            )
+            copied += len(page["ids"])
+        print(f"Colección {name} creada: {copied} documentos")
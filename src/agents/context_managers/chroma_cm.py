@@ -1,6 +1,11 @@
+import asyncio
+import threading
+from contextlib import contextmanager
 from datetime import UTC, datetime, timedelta, timezone
-from typing import Sequence
+from functools import cache, lru_cache
+from typing import Iterator, Sequence
 
+import chromadb
 import tiktoken
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
@@ -9,13 +14,19 @@ from langchain_core.messages import (
     BaseMessage,
     HumanMessage,
     SystemMessage,
-    trim_messages,
 )
 
 from src import ENV
-from src.consts import DocType
+from src.consts import DocType, type_collection_name
 
 from ...core.entities.context_manager import ContextManager
+from ...core.entities.vector_store import VectorStoreManager
+from ...core.metrics import FAST_BUCKETS, Counter, Histogram
+from ..vector_stores.chroma_vs import ChromaVectorStore
+from ..vector_stores.numpy_vs import NumpyVectorStore
+from ..vector_stores.versions import resolve_directory
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+from .faq_index import FAQIndex
 from .prompts import (
     CALENDAR_EVENT_PROMPT,
     CALENDAR_METADATA_PROMPT,
@@ -29,6 +40,87 @@ from .prompts import (
     VERIFICATION_TEMPLATE_DEFAULT,
 )
 
+TOKEN_COUNT_CACHE_SIZE = 4096
+
+STAGE_TIME = Histogram(
+    "retrieval_stage_seconds",
+    "Time spent in each stage of the context retrieval, by stage and document type.",
+    buckets=FAST_BUCKETS,
+)
+BEST_MATCH = Counter("retrieval_best_match_total", "Document type that best matched the queries, by type.")
+NOT_FOUND = Counter("retrieval_not_found_total", "Requests answered with the not found prompt.")
+
+
+@cache
+def _encoding() -> tiktoken.Encoding:
+    return tiktoken.encoding_for_model("text-embedding-3-small")
+
+
+@lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def _count_tokens(content: str) -> int:
+    return len(_encoding().encode(content))
+
+
+@cache
+def shared_embedding_cache() -> EmbeddingCache:
+    """Return the query embedding cache shared by every context manager of the process."""
+    return EmbeddingCache(
+        max_entries=ENV.cache.emb_max_entries,
+        max_bytes=ENV.cache.emb_max_bytes,
+        ttl=ENV.cache.emb_ttl,
+    )
+
+
+def create_vector_store(client: chromadb.ClientAPI, vector_db: Chroma) -> VectorStoreManager:
+    """Build the retrieval backend selected by ``RETRIEVAL_BACKEND`` over a Chroma collection of ``client``."""
+    match ENV.retrieval.backend:
+        case "chroma":
+            type_collections: dict[str, Chroma] = {}
+            if ENV.retrieval.per_type_collections:
+                existing = {collection.name for collection in client.list_collections()}
+                type_collections = {
+                    doc_type.value: Chroma(
+                        client=client,
+                        collection_name=type_collection_name(doc_type),
+                        embedding_function=vector_db.embeddings,
+                    )
+                    for doc_type in DocType
+                    if type_collection_name(doc_type) in existing
+                }
+            return ChromaVectorStore(vector_db, type_collections=type_collections)
+        case "numpy":
+            return NumpyVectorStore.from_chroma(vector_db)
+        case _:
+            raise NotImplementedError("Retrieval backend not supported")
+
+
+class RetrievalIndex:
+    """One opened version of the vector database, leased by the requests that search it.
+
+    Attributes:
+        directory: The directory of the vector database version.
+        client: The persistent Chroma client of this version.
+        vector_db: The Chroma collection holding every document.
+        store: The retrieval backend searched with the query embeddings.
+        faq_index: Exact-match index of the questions and answers, if enabled.
+        leases: Number of requests currently using this version.
+        retired: Whether a newer version replaced this one.
+    """
+
+    def __init__(self, directory: str, emb_model: Embeddings) -> None:
+        self.directory = directory
+        self.client = chromadb.PersistentClient(path=directory)
+        self.vector_db = Chroma(client=self.client, embedding_function=emb_model)
+        self.store = create_vector_store(self.client, self.vector_db)
+        self.faq_index = FAQIndex.from_vector_store(self.vector_db) if ENV.retrieval.faq_index else None
+        self.leases = 0
+        self.retired = False
+
+    def close(self) -> None:
+        """Close the retrieval backend and the Chroma client."""
+        self.store.close()
+        self.client.close()
+
 
 class ChromaContextManager(ContextManager):
     """A context manager that retrieves and trims context from a Chroma vector database.
@@ -36,8 +128,14 @@ class ChromaContextManager(ContextManager):
     This class handles the retrieval of relevant context from a Chroma vector database
     based on user queries and manages the trimming of messages to fit within token limits.
 
+    The database is opened from the version published under ``CHROMA_PERSIST_DIRECTORY``
+    and can be switched to a newer version at runtime with ``reload``. Each request
+    leases the version it started on, and a replaced version is closed once its last
+    request is done.
+
     Attributes:
-        vectorDB: The Chroma vector database instance for storing and retrieving embeddings.
+        emb_model: The embedding model used to vectorize the queries, behind the shared embedding cache.
+        index: The version of the vector database new requests are served from.
     """
 
     def __init__(self, emb_model: Embeddings) -> None:
@@ -46,30 +144,128 @@ class ChromaContextManager(ContextManager):
         Args:
             emb_model: The embedding model to use for vectorization.
         """
-        self.vectorDB = Chroma(
-            persist_directory=ENV.chroma.persist_directory,
-            embedding_function=emb_model,
-        )
+        self.emb_model = CachedEmbeddings(emb_model, cache=shared_embedding_cache())
+        self.index = RetrievalIndex(resolve_directory(ENV.chroma.persist_directory), self.emb_model)
+        self._lock = threading.Lock()
+        self._reload_lock = asyncio.Lock()
+
+    @property
+    def client(self) -> chromadb.ClientAPI:
+        return self.index.client
+
+    @property
+    def vectorDB(self) -> Chroma:
+        return self.index.vector_db
+
+    @property
+    def store(self) -> VectorStoreManager:
+        return self.index.store
+
+    @property
+    def faq_index(self) -> FAQIndex | None:
+        return self.index.faq_index
+
+    @contextmanager
+    def _lease(self) -> Iterator[RetrievalIndex]:
+        with self._lock:
+            index = self.index
+            index.leases += 1
+        try:
+            yield index
+        finally:
+            with self._lock:
+                index.leases -= 1
+                drained = index.retired and index.leases == 0
+            if drained:
+                index.close()
+
+    def _swap(self, index: RetrievalIndex) -> None:
+        with self._lock:
+            previous, self.index = self.index, index
+            previous.retired = True
+            drained = previous.leases == 0
+        if drained:
+            previous.close()
+
+    async def reload(self) -> bool:
+        """Switch to the published version of the vector database, if it changed.
+
+        The new version is opened off the event loop while requests keep using the
+        current one, which is closed once the requests that leased it are done.
 
-    async def retrieve_context(self, query, history):
+        Returns:
+            True if a new version was loaded.
+        """
+        async with self._reload_lock:
+            directory = resolve_directory(ENV.chroma.persist_directory)
+            if directory == self.index.directory:
+                return False
+            self._swap(await asyncio.to_thread(RetrievalIndex, directory, self.emb_model))
+            return True
+
+    async def aclose(self) -> None:
+        """Close the current version of the vector database."""
+        with self._lock:
+            index = self.index
+            index.retired = True
+            drained = index.leases == 0
+        if drained:
+            index.close()
+
+    async def retrieve_context(self, query, history, token_counts=None):
         """Retrieve context from the vector database and build a system message.
 
         Args:
             query: The user's query string.
             history: The conversation history.
+            token_counts: The tokens of the history messages, when already counted.
 
         Returns:
             The trimmed context messages including system message.
         """
         query_message = HumanMessage(content=query)
-        messages = await self.trim_context([*history, query_message])
+        with STAGE_TIME.time(stage="trim_context"):
+            messages = await self.trim_context([*history, query_message], token_counts)
 
-        user_message = filter(lambda msg: isinstance(msg, HumanMessage), messages)
+        with self._lease() as index:
+            faq_match = index.faq_index.lookup(query) if index.faq_index is not None else None
+            if faq_match is not None:
+                system_messages = [self.__chat_system_prompt(), SystemMessage(self.__format_q_a(*faq_match))]
+                return [*system_messages, *messages]
 
-        system_messages = await self.build_system_messages(list(user_message)[-3:])
+            user_message = filter(lambda msg: isinstance(msg, HumanMessage), messages)
+
+            system_messages = await self._build_system_messages(index, list(user_message)[-3:])
 
         return [*system_messages, *messages]
 
+    async def lookup_answer(self, query: str) -> str | None:
+        """Return the canned answer of a FAQ question when the LLM can be skipped.
+
+        Args:
+            query: The user's query string.
+
+        Returns:
+            The answer if the query matches a known question and ``RETRIEVAL_FAQ_SKIP_LLM``
+            is enabled, otherwise None.
+        """
+        if self.faq_index is None or not ENV.retrieval.faq_skip_llm:
+            return None
+        faq_match = self.faq_index.lookup(query)
+        return faq_match[1] if faq_match is not None else None
+
+    async def embed_query(self, query: str) -> list[float]:
+        """Embed a user query the same way build_system_messages does.
+
+        Args:
+            query: The user's query string.
+
+        Returns:
+            The query embedding, usually served by the embedding cache.
+        """
+        with STAGE_TIME.time(stage="embedding"):
+            return await self.emb_model.aembed_query(query.strip().lower())
+
     def __format_verification(self, documents: list[Document]):
         content = []
         for document in documents:
@@ -84,27 +280,85 @@ class ChromaContextManager(ContextManager):
             content.append(document.page_content)
         return "\n\n".join(content)
 
+    def __format_q_a(self, question: str, answer: str):
+        content = f"Question: {question}\nAnswer: {answer}"
+        return Q_A_PROMPT.format(question="query", content=content)
+
+    def __chat_system_prompt(self) -> SystemMessage:
+        current_date = datetime.now(UTC)
+        date_str = current_date.astimezone(timezone(offset=timedelta(hours=-4), name="America/La_Paz")).strftime(
+            "%d de %B del %Y"
+        )
+        return SystemMessage(content=CHAT_SYSTEM_PROMPT.format(date=date_str))
+
+    async def _search(
+        self,
+        index: RetrievalIndex,
+        embeddings: list[list[float]],
+        k: int,
+        doc_type: str | None = None,
+        score_threshold: float | None = None,
+    ) -> list[list[Document]]:
+        """Search the retrieval backend with already computed embeddings, off the event loop.
+
+        Args:
+            index: The leased version of the vector database.
+            embeddings: The query vectors, searched in a single batch.
+            k: Maximum number of documents returned per query.
+            doc_type: Only return documents with this ``type`` metadata.
+            score_threshold: When given, drop documents whose relevance score is lower.
+
+        Returns:
+            The matching documents of each query, most similar first.
+        """
+        return await asyncio.to_thread(
+            index.store.batch_search, embeddings, k, doc_type=doc_type, score_threshold=score_threshold
+        )
+
+    async def _typed_search(
+        self,
+        index: RetrievalIndex,
+        embedding: list[float],
+        k: int,
+        doc_type: str,
+        score_threshold: float | None = None,
+    ) -> list[Document]:
+        """Search the documents of one type with a single query vector, timed per type."""
+        with STAGE_TIME.time(stage="typed_search", doc_type=doc_type):
+            [documents] = await self._search(
+                index, [embedding], k=k, doc_type=doc_type, score_threshold=score_threshold
+            )
+        return documents
+
     async def build_system_messages(self, queries: Sequence[BaseMessage]) -> Sequence[SystemMessage]:
         """Build a system message with contextual information from the vector database.
 
+        Every text needed for the request (each user query and their concatenation)
+        is embedded in a single batch, and the searches reuse those vectors.
+
         Args:
-            query: The user's query string to search for relevant documents.
+            queries: The latest user messages, oldest first.
 
         Returns:
             A SystemMessage containing the formatted context from the database.
         """
-
-        score_retriever = self.vectorDB.as_retriever(
-            search_type="similarity_score_threshold",
-            search_kwargs={"score_threshold": 0.1, "k": 3},
-        )
-        relevant_docs: list[Document] = []
-        complete_context = ""
-        for query in queries[::-1]:
-            query_str = str(query.content).lower()
-            relevant_docs += score_retriever.invoke(query_str)
-            complete_context += f"{query_str} "
-        relevant_docs += score_retriever.invoke(complete_context.strip())
+        with self._lease() as index:
+            return await self._build_system_messages(index, queries)
+
+    async def _build_system_messages(
+        self, index: RetrievalIndex, queries: Sequence[BaseMessage]
+    ) -> Sequence[SystemMessage]:
+        search_queries = [str(query.content).strip().lower() for query in queries[::-1]]
+        complete_context = " ".join(search_queries)
+        with STAGE_TIME.time(stage="embedding"):
+            embeddings = await self.emb_model.aembed_documents([*search_queries, complete_context])
+        query_embeddings, context_embedding = embeddings[:-1], embeddings[-1]
+
+        # The classification searches run as a single batch in the executor so the
+        # event loop is never blocked by the retrieval backend.
+        with STAGE_TIME.time(stage="classification_search"):
+            search_results = await self._search(index, embeddings, k=3, score_threshold=0.1)
+        relevant_docs: list[Document] = [doc for documents in search_results for doc in documents]
 
         content_type = {}
         for doc in relevant_docs:
@@ -117,91 +371,121 @@ class ChromaContextManager(ContextManager):
         if content_type:
             best_match = str(max(content_type, key=lambda key: content_type.get(key, 0)))
 
-        current_date = datetime.now(UTC)
-        date_str = current_date.astimezone(timezone(offset=timedelta(hours=-4), name="America/La_Paz")).strftime(
-            "%d de %B del %Y"
-        )
-
-        system_prompts = [SystemMessage(content=CHAT_SYSTEM_PROMPT.format(date=date_str))]
+        BEST_MATCH.inc(doc_type=best_match or "none")
+        system_prompts = [self.__chat_system_prompt()]
 
         match best_match:
             case DocType.VERIFICATIONS.value:
-                retriver = self.vectorDB.as_retriever(search_kwargs={"k": 10, "filter": {"type": best_match}})
-                documents = await retriver.ainvoke(complete_context)
-                content = self.__format_verification(documents)
+                documents = await self._typed_search(index, context_embedding, k=10, doc_type=best_match)
+                with STAGE_TIME.time(stage="prompt_assembly"):
+                    content = self.__format_verification(documents)
                 system_prompts.append(SystemMessage(content))
 
             case DocType.GOV_PROGRAMS.value:
-                retriver = self.vectorDB.as_retriever(search_kwargs={"k": 20, "filter": {"type": best_match}})
-                documents = await retriver.ainvoke(complete_context)
-                content = self.__format_content(documents)
-                content = GOV_PROGRAM_PROMPT.format(content=content)
+                documents = await self._typed_search(index, context_embedding, k=20, doc_type=best_match)
+                with STAGE_TIME.time(stage="prompt_assembly"):
+                    content = self.__format_content(documents)
+                    content = GOV_PROGRAM_PROMPT.format(content=content)
                 system_prompts.append(SystemMessage(content))
 
             case DocType.CALENDAR_META.value:
-                retriver = self.vectorDB.as_retriever(search_kwargs={"k": 20, "filter": {"type": best_match}})
-                documents = await retriver.ainvoke(complete_context)
-                content = self.__format_content(documents)
-                content = CALENDAR_METADATA_PROMPT.format(content=content)
+                documents = await self._typed_search(index, context_embedding, k=20, doc_type=best_match)
+                with STAGE_TIME.time(stage="prompt_assembly"):
+                    content = self.__format_content(documents)
+                    content = CALENDAR_METADATA_PROMPT.format(content=content)
                 system_prompts.append(SystemMessage(content))
 
             case DocType.CALENDAR.value:
-                retriver = self.vectorDB.as_retriever(search_kwargs={"k": 20, "filter": {"type": best_match}})
-                documents = await retriver.ainvoke(complete_context)
-                content = self.__format_content(documents)
-                content = CALENDAR_EVENT_PROMPT.format(content=content)
+                documents = await self._typed_search(index, context_embedding, k=20, doc_type=best_match)
+                with STAGE_TIME.time(stage="prompt_assembly"):
+                    content = self.__format_content(documents)
+                    content = CALENDAR_EVENT_PROMPT.format(content=content)
                 system_prompts.append(SystemMessage(content))
 
             case DocType.CANDIDATES.value:
-                retriver = self.vectorDB.as_retriever(search_kwargs={"k": 20, "filter": {"type": best_match}})
-                documents = await retriver.ainvoke(complete_context)
-                content = self.__format_content(documents)
-                content = CANDIDATES_PROMPT.format(content=content)
+                documents = await self._typed_search(index, context_embedding, k=20, doc_type=best_match)
+                with STAGE_TIME.time(stage="prompt_assembly"):
+                    content = self.__format_content(documents)
+                    content = CANDIDATES_PROMPT.format(content=content)
                 system_prompts.append(SystemMessage(content))
 
             case DocType.Q_A.value:
-                retriver = self.vectorDB.as_retriever(
-                    search_type="similarity_score_threshold",
-                    search_kwargs={"score_threshold": 0.1, "k": 1, "filter": {"type": best_match}},
+                # The last user query is the first one embedded.
+                query_embedding = query_embeddings[0] if query_embeddings else context_embedding
+                documents = await self._typed_search(
+                    index, query_embedding, k=1, doc_type=best_match, score_threshold=0.1
                 )
-                query = queries[-1]
-                query_str = str(query.content) if len(queries) > 0 else ""  # type: ignore
-                query_str = query_str.strip().lower()
-                documents = await retriver.ainvoke(query_str)
-                content = ""
-                for doc in documents:
-                    content = f"Question: {doc.page_content}\nAnswer: {doc.metadata.get('answer', '')}\n"
-
-                content = Q_A_PROMPT.format(question="query", content=content.strip())
+                with STAGE_TIME.time(stage="prompt_assembly"):
+                    if documents:
+                        content = self.__format_q_a(
+                            documents[-1].page_content, documents[-1].metadata.get("answer", "")
+                        )
+                    else:
+                        content = Q_A_PROMPT.format(question="query", content="")
                 system_prompts.append(SystemMessage(content))
 
             case _:
+                NOT_FOUND.inc()
                 system_prompts.append(SystemMessage(NOT_FOUND_PROMPT))
 
         return system_prompts
 
-    async def trim_context(self, context) -> list[BaseMessage]:
+    def count_tokens(self, message: BaseMessage) -> int:
+        """Count the tokens of a message, memoized by content.
+
+        Args:
+            message: The message to count.
+
+        Returns:
+            The number of tokens of the message content.
+        """
+        return _count_tokens(str(message.content))
+
+    async def trim_context(self, context, token_counts=None) -> list[BaseMessage]:
         """Trim messages to fit within token limits using OpenAI token counting.
 
+        Keeps the longest suffix of the conversation that fits in the context length,
+        starting on a human message and ending on a human or tool message. A leading
+        system message is always kept. This matches ``trim_messages`` with
+        ``strategy="last"`` and ``start_on="human"``, but counts each message once.
+
         Args:
             context: List of message objects to trim.
+            token_counts: The tokens of the first messages of ``context``, such as the
+                counts a chat session stored when the messages were added. The other
+                messages are counted here.
 
         Returns:
             The trimmed list of messages that fit within the token limit.
         """
-        encoding = tiktoken.encoding_for_model("text-embedding-3-small")
-
-        def count_tokens_openai(message_list: list[BaseMessage]):
-            return sum(len(encoding.encode(str(msg.content))) for msg in message_list if hasattr(msg, "content"))
-
-        trimmed_user = trim_messages(
-            context,
-            token_counter=count_tokens_openai,
-            max_tokens=ENV.llm.context_length,
-            strategy="last",
-            start_on="human",
-            end_on=("human", "tool"),
-            include_system=True,
-        )
-
-        return trimmed_user
+        messages = list(context)
+        known = list(token_counts or ())[: len(messages)]
+        counts: list[int | None] = [*known, *[None] * (len(messages) - len(known))]
+        while messages and messages[-1].type not in ("human", "tool"):
+            messages.pop()
+            counts.pop()
+
+        def tokens(index: int) -> int:
+            count = counts[index]
+            return count if count is not None else self.count_tokens(messages[index])
+
+        system_messages: list[BaseMessage] = []
+        max_tokens = ENV.llm.context_length
+        if messages and isinstance(messages[0], SystemMessage):
+            system_messages.append(messages[0])
+            max_tokens = max(0, max_tokens - tokens(0))
+            messages = messages[1:]
+            counts = counts[1:]
+
+        start = len(messages)
+        total_tokens = 0
+        while start > 0:
+            total_tokens += tokens(start - 1)
+            if total_tokens > max_tokens:
+                break
+            start -= 1
+
+        while start < len(messages) and messages[start].type != "human":
+            start += 1
+
+        return [*system_messages, *messages[start:]]
@@ -0,0 +1,165 @@
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a text so equivalent queries share a cache entry.
+
+    Args:
+        text: The text to normalize.
+
+    Returns:
+        The lower-cased text with collapsed whitespace.
+    """
+    return " ".join(text.split()).lower()
+
+
+@dataclass
+class _CacheEntry:
+    vector: array
+    expires_at: float
+    size: int
+
+
+class EmbeddingCache:
+    """An in-process LRU cache of embedding vectors with TTL eviction.
+
+    The cache is bounded both by number of entries and by the approximate number
+    of bytes held by the vectors. Entries older than the TTL are dropped on access.
+
+    Attributes:
+        max_entries (int): Maximum number of vectors kept. 0 disables the cache.
+        max_bytes (int): Maximum approximate size of the cached vectors.
+        ttl (float): Seconds a vector stays valid after being stored.
+        hits (int): Number of lookups answered by the cache.
+        misses (int): Number of lookups that had to be embedded.
+        evictions (int): Number of entries dropped by size or TTL.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._entries: OrderedDict[bytes, _CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> bytes:
+        """Build the cache key of a text for a given embedding model."""
+        return hashlib.blake2b(f"{model}\0{normalize_text(text)}".encode(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> list[float] | None:
+        """Return the cached vector for a key, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.vector.tolist()
+
+    def put(self, key: bytes, vector: list[float]) -> None:
+        """Store a vector, evicting the least recently used entries if needed."""
+        if self.max_entries <= 0:
+            return
+        stored = array("d", vector)
+        entry = _CacheEntry(stored, time.monotonic() + self.ttl, len(key) + stored.itemsize * len(stored))
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.size_bytes += entry.size
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached vector."""
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        """Return the cache counters."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _remove(self, key: bytes) -> None:
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends uncached texts to the wrapped model.
+
+    Attributes:
+        embeddings (Embeddings): The wrapped embedding model.
+        cache (EmbeddingCache): The cache shared by the wrapper.
+        model_name (str): Name of the embedding model, part of every cache key.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str | None = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name or str(getattr(embeddings, "model", None) or type(embeddings).__name__)
+
+    def _lookup(self, texts: list[str]) -> tuple[list[list[float] | None], list[bytes], dict[bytes, str]]:
+        keys = [self.cache.make_key(self.model_name, text) for text in texts]
+        vectors: list[list[float] | None] = []
+        missing: dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            vector = self.cache.get(key) if key not in missing else None
+            vectors.append(vector)
+            if vector is None:
+                missing.setdefault(key, text)
+        return vectors, keys, missing
+
+    def _merge(
+        self,
+        vectors: list[list[float] | None],
+        keys: list[bytes],
+        missing: dict[bytes, str],
+        embedded: list[list[float]],
+    ) -> list[list[float]]:
+        computed = dict(zip(missing, embedded))
+        for key, vector in computed.items():
+            self.cache.put(key, vector)
+        return [vector if vector is not None else computed[key] for vector, key in zip(vectors, keys)]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors, keys, missing = self._lookup(texts)
+        embedded = self.embeddings.embed_documents(list(missing.values())) if missing else []
+        return self._merge(vectors, keys, missing, embedded)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors, keys, missing = self._lookup(texts)
+        embedded = await self.embeddings.aembed_documents(list(missing.values())) if missing else []
+        return self._merge(vectors, keys, missing, embedded)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self.aembed_documents([text]))[0]
@@ -0,0 +1,68 @@
+import re
+import unicodedata
+
+from langchain_chroma import Chroma
+
+from src.consts import DocType
+
+_NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+
+def normalize_question(text: str) -> str:
+    """Normalize a question so trivial variations map to the same key.
+
+    Accents, punctuation (including ``¿`` and ``¡``), case and repeated
+    whitespace are ignored.
+
+    Args:
+        text: The question to normalize.
+
+    Returns:
+        The normalized question.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD_PATTERN.sub(" ", without_accents).strip()
+
+
+class FAQIndex:
+    """In-memory hash index from normalized questions to their canned answers.
+
+    Attributes:
+        entries (dict[str, tuple[str, str]]): Normalized question to (question, answer).
+    """
+
+    def __init__(self, questions_and_answers: list[tuple[str, str]]):
+        """Index a list of questions and answers.
+
+        Args:
+            questions_and_answers: Pairs of (question, answer).
+        """
+        self.entries = {
+            normalize_question(question): (question, answer) for question, answer in questions_and_answers
+        }
+
+    @classmethod
+    def from_vector_store(cls, vector_store: Chroma) -> "FAQIndex":
+        """Build the index from the ``questions_and_answers`` documents of a collection.
+
+        Args:
+            vector_store: The Chroma collection holding the documents.
+
+        Returns:
+            The FAQ index.
+        """
+        results = vector_store.get(where={"type": DocType.Q_A.value}, include=["documents", "metadatas"])
+        return cls(
+            [
+                (str(question), str((metadata or {}).get("answer", "")))
+                for question, metadata in zip(results["documents"], results["metadatas"])
+            ]
+        )
+
+    def lookup(self, query: str) -> tuple[str, str] | None:
+        """Return the (question, answer) pair matching a query exactly after normalization."""
+        return self.entries.get(normalize_question(query))
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -2,12 +2,18 @@ from langchain_nebius import ChatNebius, NebiusEmbeddings
 
 from src import ENV
 from src.core.agent import Agent
+from src.core.response_cache import ResponseCache
+from src.core.scheduler import LLMScheduler
 
 from .context_managers.chroma_cm import ChromaContextManager
 
 
 class NebiusAgent(Agent):
-    def __init__(self):
+    def __init__(
+        self,
+        response_cache: ResponseCache | None = None,
+        scheduler: LLMScheduler | None = None,
+    ):
         super().__init__(
             chat_model=ChatNebius(
                 model=ENV.llm.model,
@@ -21,4 +27,6 @@ class NebiusAgent(Agent):
                     api_key=ENV.llm.api_key,
                 )
             ),
+            response_cache=response_cache,
+            scheduler=scheduler,
         )
@@ -2,11 +2,17 @@ from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
 from .. import ENV
 from ..core.agent import Agent
+from ..core.response_cache import ResponseCache
+from ..core.scheduler import LLMScheduler
 from .context_managers.chroma_cm import ChromaContextManager
 
 
 class OpenAIAgent(Agent):
-    def __init__(self):
+    def __init__(
+        self,
+        response_cache: ResponseCache | None = None,
+        scheduler: LLMScheduler | None = None,
+    ):
         super().__init__(
             chat_model=ChatOpenAI(
                 model=ENV.llm.model,
@@ -20,4 +26,6 @@ class OpenAIAgent(Agent):
                     api_key=ENV.llm.api_key,
                 )
             ),
+            response_cache=response_cache,
+            scheduler=scheduler,
         )
@@ -0,0 +1,64 @@
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+from ...core.entities.vector_store import VectorStoreManager
+
+
+class ChromaVectorStore(VectorStoreManager):
+    """Retrieval backend that queries a Chroma collection.
+
+    Typed searches are routed to the per-type collection of that type when one
+    is available, instead of filtering the mixed collection.
+
+    Attributes:
+        vector_store: The mixed Chroma collection searched.
+        type_collections: Collections holding only the documents of one type, by type.
+    """
+
+    def __init__(self, vector_store: Chroma, type_collections: dict[str, Chroma] | None = None) -> None:
+        self.vector_store = vector_store
+        self.type_collections = type_collections or {}
+
+    def batch_search(
+        self,
+        embeddings: list[list[float]],
+        k: int,
+        doc_type: str | None = None,
+        score_threshold: float | None = None,
+    ) -> list[list[Document]]:
+        if not embeddings:
+            return []
+        vector_store = self.vector_store
+        where = {"type": doc_type} if doc_type else None
+        if doc_type in self.type_collections:
+            vector_store, where = self.type_collections[doc_type], None
+
+        results = vector_store._collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        relevance_score_fn = vector_store._select_relevance_score_fn()
+
+        batches: list[list[Document]] = []
+        for contents, metadatas, ids, distances in zip(
+            results["documents"] or [],
+            results["metadatas"] or [],
+            results["ids"],
+            results["distances"] or [],
+        ):
+            batches.append(
+                [
+                    Document(page_content=content or "", metadata=dict(metadata or {}), id=doc_id)
+                    for content, metadata, doc_id, distance in zip(contents, metadatas, ids, distances)
+                    if score_threshold is None or relevance_score_fn(distance) >= score_threshold
+                ]
+            )
+        return batches
+
+    def add_documents(self, documents: list[Document], ids: list[str] | None = None) -> None:
+        self.vector_store.add_documents(documents, ids=ids)
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        self.vector_store.delete(ids=document_ids)
@@ -0,0 +1,183 @@
+import math
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from ...core.entities.vector_store import VectorStoreManager
+
+
+@dataclass(frozen=True)
+class _Index:
+    ids: list[str]
+    documents: list[Document]
+    matrix: np.ndarray
+    squared_norms: np.ndarray
+    type_masks: dict[str, np.ndarray]
+
+
+def _build_index(ids: list[str], documents: list[Document], matrix: np.ndarray) -> _Index:
+    types = np.array([str(document.metadata.get("type", "")) for document in documents])
+    return _Index(
+        ids=ids,
+        documents=documents,
+        matrix=matrix,
+        squared_norms=np.einsum("ij,ij->i", matrix, matrix),
+        type_masks={str(doc_type): types == doc_type for doc_type in np.unique(types)},
+    )
+
+
+class NumpyVectorStore(VectorStoreManager):
+    """Retrieval backend that keeps every embedding in one float32 matrix.
+
+    Searches are answered with a single matrix product for all the queries of a
+    batch, and typed searches use precomputed per-type boolean masks. Distances and
+    relevance scores follow the Chroma conventions of the configured distance space,
+    so score thresholds behave the same as with the Chroma backend.
+
+    Attributes:
+        space: Distance space of the source collection: ``l2``, ``cosine`` or ``ip``.
+        embedding_function: Model used to embed documents added after loading.
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        documents: list[Document],
+        embeddings: np.ndarray | list[list[float]],
+        space: str = "l2",
+        embedding_function: Embeddings | None = None,
+    ) -> None:
+        if space not in ("l2", "cosine", "ip"):
+            raise ValueError(f"Unsupported distance space: {space}")
+        self.space = space
+        self.embedding_function = embedding_function
+        matrix = np.asarray(embeddings, dtype=np.float32) if documents else np.empty((0, 0), dtype=np.float32)
+        self._index = _build_index(list(ids), list(documents), matrix)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_chroma(cls, vector_store: Chroma) -> "NumpyVectorStore":
+        """Load every embedding, document and metadata of a Chroma collection.
+
+        Args:
+            vector_store: The Chroma collection to load.
+
+        Returns:
+            The in-memory vector store.
+        """
+        results = vector_store.get(include=["embeddings", "documents", "metadatas"])
+        documents = [
+            Document(page_content=content or "", metadata=dict(metadata or {}), id=doc_id)
+            for doc_id, content, metadata in zip(results["ids"], results["documents"], results["metadatas"])
+        ]
+        hnsw_config = vector_store._collection.configuration.get("hnsw") or {}
+        return cls(
+            ids=results["ids"],
+            documents=documents,
+            embeddings=results["embeddings"],
+            space=hnsw_config.get("space") or "l2",
+            embedding_function=vector_store.embeddings,
+        )
+
+    def __len__(self) -> int:
+        return len(self._index.ids)
+
+    def _distances(self, index: _Index, queries: np.ndarray) -> np.ndarray:
+        products = queries @ index.matrix.T
+        match self.space:
+            case "l2":
+                query_norms = np.einsum("ij,ij->i", queries, queries)
+                return np.maximum(query_norms[:, None] + index.squared_norms[None, :] - 2 * products, 0)
+            case "cosine":
+                norms = np.sqrt(np.einsum("ij,ij->i", queries, queries))[:, None] * np.sqrt(index.squared_norms)
+                return 1 - products / np.where(norms == 0, 1, norms)
+            case _:
+                return 1 - products
+
+    def _relevance_scores(self, distances: np.ndarray) -> np.ndarray:
+        match self.space:
+            case "l2":
+                return 1 - distances / math.sqrt(2)
+            case "cosine":
+                return 1 - distances
+            case _:
+                return np.where(distances > 0, 1 - distances, -distances)
+
+    def batch_search(
+        self,
+        embeddings: list[list[float]],
+        k: int,
+        doc_type: str | None = None,
+        score_threshold: float | None = None,
+    ) -> list[list[Document]]:
+        index = self._index
+        if not embeddings:
+            return []
+        candidates = len(index.ids)
+        mask = None
+        if doc_type:
+            mask = index.type_masks.get(doc_type)
+            candidates = int(mask.sum()) if mask is not None else 0
+        k = min(k, candidates)
+        if k <= 0:
+            return [[] for _ in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        distances = self._distances(index, queries)
+        if mask is not None:
+            distances = np.where(mask[None, :], distances, np.inf)
+
+        top_k = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        top_distances = np.take_along_axis(distances, top_k, axis=1)
+        order = np.argsort(top_distances, axis=1, kind="stable")
+        top_k = np.take_along_axis(top_k, order, axis=1)
+        top_distances = np.take_along_axis(top_distances, order, axis=1)
+        relevance_scores = self._relevance_scores(top_distances)
+
+        return [
+            [
+                index.documents[position]
+                for position, score in zip(positions.tolist(), scores.tolist())
+                if score_threshold is None or score >= score_threshold
+            ]
+            for positions, scores in zip(top_k, relevance_scores)
+        ]
+
+    def add_documents(self, documents: list[Document], ids: list[str] | None = None) -> None:
+        if self.embedding_function is None:
+            raise ValueError("An embedding function is required to add documents")
+        if ids is None:
+            ids = [document.id or str(len(self) + position) for position, document in enumerate(documents)]
+        vectors = np.asarray(
+            self.embedding_function.embed_documents([document.page_content for document in documents]),
+            dtype=np.float32,
+        )
+        added = [
+            Document(page_content=document.page_content, metadata=document.metadata, id=doc_id)
+            for document, doc_id in zip(documents, ids)
+        ]
+        with self._lock:
+            index = self._index
+            replaced = set(ids)
+            keep = [position for position, doc_id in enumerate(index.ids) if doc_id not in replaced]
+            matrix = index.matrix[keep] if index.matrix.size else np.empty((0, vectors.shape[1]), dtype=np.float32)
+            self._index = _build_index(
+                [index.ids[position] for position in keep] + list(ids),
+                [index.documents[position] for position in keep] + added,
+                np.vstack([matrix, vectors]),
+            )
+
+    def delete_documents(self, document_ids: list[str]) -> None:
+        with self._lock:
+            index = self._index
+            removed = set(document_ids)
+            keep = [position for position, doc_id in enumerate(index.ids) if doc_id not in removed]
+            self._index = _build_index(
+                [index.ids[position] for position in keep],
+                [index.documents[position] for position in keep],
+                index.matrix[keep],
+            )
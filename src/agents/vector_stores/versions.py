@@ -0,0 +1,80 @@
+import os
+import shutil
+from datetime import UTC, datetime
+
+CURRENT_FILE = "CURRENT"
+# Written into a version directory right before it is published, so the versions
+# left behind by interrupted builds are never kept in place of complete ones.
+COMPLETE_FILE = "COMPLETE"
+VERSIONS_DIRECTORY = "versions"
+
+
+def current_version(root: str) -> str | None:
+    """Return the name of the published version under ``root``, or None if nothing was published."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_directory(root: str) -> str:
+    """Return the directory of the published version of the vector database.
+
+    Falls back to ``root`` itself, the layout used before versioned builds, when no
+    version has been published yet.
+    """
+    version = current_version(root)
+    return os.path.join(root, VERSIONS_DIRECTORY, version) if version else root
+
+
+def new_version_directory(root: str) -> str:
+    """Create an empty directory for a new build of the vector database."""
+    versions = os.path.join(root, VERSIONS_DIRECTORY)
+    os.makedirs(versions, exist_ok=True)
+    name = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%fZ")
+    path = os.path.join(versions, name)
+    os.makedirs(path)
+    return path
+
+
+def publish_version(root: str, directory: str) -> None:
+    """Mark a version directory as complete and atomically point ``root`` to it.
+
+    The pointer file is replaced with ``os.replace``, so readers see either the
+    previous version or the new one, never a partial write.
+    """
+    with open(os.path.join(directory, COMPLETE_FILE), "w", encoding="utf-8"):
+        pass
+    pointer = os.path.join(root, CURRENT_FILE)
+    temporary = f"{pointer}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        file.write(os.path.basename(directory))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, pointer)
+
+
+def prune_versions(root: str, keep: int) -> list[str]:
+    """Delete all but the ``keep`` most recent complete versions, never deleting the published one.
+
+    Incomplete versions, left behind by interrupted builds, never count toward ``keep``.
+    The ones older than the published version are deleted; newer ones may still be
+    being built.
+
+    Returns:
+        The names of the deleted versions.
+    """
+    versions = os.path.join(root, VERSIONS_DIRECTORY)
+    if not os.path.isdir(versions):
+        return []
+    current = current_version(root)
+    names = sorted(os.listdir(versions), reverse=True)
+    complete = [
+        name for name in names if name == current or os.path.exists(os.path.join(versions, name, COMPLETE_FILE))
+    ]
+    deleted = [name for name in complete[keep:] if name != current]
+    deleted += [name for name in names if name not in complete and current is not None and name < current]
+    for name in deleted:
+        shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+    return deleted
@@ -1,9 +1,78 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from functools import partial
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from src import ENV
+from src.core.metrics import REGISTRY
+from src.core.scheduler import SchedulerBusy
+
+from .deps import AgentPool
+from .routes import api, metrics_router
+from .sessions import SessionStore
+from .telegram import TelegramUpdateQueue, UpdateDeduplicator, answer_update, close_bot, create_bot, stream_update
+
 
-from .routes import api
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared agents and Telegram bot and start the Telegram workers on
+    startup, and release them on shutdown.
+
+    While the application runs, the published version of the vector database is
+    polled every ``CHROMA_WATCH_INTERVAL`` seconds and the agents switch to new ones.
+
+    Args:
+        app (FastAPI): The application being served.
+    """
+    app.state.agent_pool = AgentPool(size=ENV.agent.pool_size)
+    app.state.sessions = SessionStore(
+        max_messages=ENV.session.max_messages,
+        max_tokens=ENV.llm.context_length,
+        max_bytes=ENV.session.max_bytes,
+        idle_timeout=ENV.session.idle_timeout,
+    )
+    app.state.telegram_bot = create_bot(ENV.telegram_token.get_secret_value(), ENV.bot.pool_size)
+    if ENV.bot.streaming:
+        handler = partial(
+            stream_update,
+            agent_pool=app.state.agent_pool,
+            bot=app.state.telegram_bot,
+            edit_interval=ENV.bot.edit_interval,
+        )
+    else:
+        handler = partial(answer_update, agent_pool=app.state.agent_pool, bot=app.state.telegram_bot)
+    app.state.telegram_queue = TelegramUpdateQueue(
+        handler=handler,
+        workers=ENV.bot.workers,
+        queue_size=ENV.bot.queue_size,
+        deduplicator=UpdateDeduplicator(max_entries=ENV.bot.dedup_max_entries, ttl=ENV.bot.dedup_ttl),
+    )
+    app.state.telegram_queue.start()
+    watcher = None
+    if ENV.chroma.watch_interval > 0:
+        watcher = asyncio.create_task(app.state.agent_pool.watch(ENV.chroma.watch_interval))
+    try:
+        yield
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+            with suppress(asyncio.CancelledError):
+                await watcher
+        await app.state.telegram_queue.aclose(ENV.bot.drain_timeout)
+        await close_bot(app.state.telegram_bot)
+        await app.state.agent_pool.aclose()
+
+
+async def scheduler_busy_handler(request: Request, exc: SchedulerBusy) -> JSONResponse:
+    """Answer 503 when the LLM scheduler rejects a request, so clients retry later."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "El servicio está ocupado, intenta más tarde."},
+        headers={"Retry-After": "5"},
+    )
 
 
 def create_app() -> FastAPI:
@@ -13,7 +82,8 @@ def create_app() -> FastAPI:
     Returns:
         FastAPI: A configured FastAPI application instance.
     """
-    app = FastAPI()
+    REGISTRY.enabled = ENV.metrics.enabled
+    app = FastAPI(lifespan=lifespan)
     app.title = "Checki API"  # type: ignore
     app.version = "0.1.0"
     app.description = "API for Checki bot"
@@ -25,5 +95,7 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_exception_handler(SchedulerBusy, scheduler_busy_handler)
     app.include_router(api)
+    app.include_router(metrics_router)
     return app
@@ -1,13 +1,144 @@
+import asyncio
+import traceback
+from itertools import cycle
+
+from starlette.requests import HTTPConnection
+
 from .. import ENV
 from ..agents.nebius_agent import NebiusAgent
 from ..agents.openai_agent import OpenAIAgent
+from ..core.agent import Agent
+from ..core.response_cache import ResponseCache
+from ..core.scheduler import LLMScheduler
+from .sessions import SessionStore
+from .telegram import TelegramUpdateQueue
 
 
-def get_agent():
+def create_agent(
+    response_cache: ResponseCache | None = None,
+    scheduler: LLMScheduler | None = None,
+) -> Agent:
     match ENV.llm.provider:
         case "openai":
-            return OpenAIAgent()
+            return OpenAIAgent(response_cache=response_cache, scheduler=scheduler)
         case "nebius":
-            return NebiusAgent()
+            return NebiusAgent(response_cache=response_cache, scheduler=scheduler)
         case _:
             raise NotImplementedError("Provider not supported")
+
+
+def create_response_cache() -> ResponseCache | None:
+    """Build the answer cache shared by the agents, if enabled in the settings."""
+    if not ENV.cache.response_enabled:
+        return None
+    return ResponseCache(
+        threshold=ENV.cache.response_threshold,
+        max_entries=ENV.cache.response_max_entries,
+        ttl=ENV.cache.response_ttl,
+    )
+
+
+def create_scheduler() -> LLMScheduler | None:
+    """Build the LLM scheduler shared by the agents, if enabled in the settings."""
+    if ENV.scheduler.max_concurrency < 1:
+        return None
+    return LLMScheduler(
+        max_concurrency=ENV.scheduler.max_concurrency,
+        max_queue=ENV.scheduler.max_queue,
+        max_wait=ENV.scheduler.max_wait,
+        priorities={
+            "web": ENV.scheduler.priority_web,
+            "whatsapp": ENV.scheduler.priority_whatsapp,
+            "telegram": ENV.scheduler.priority_telegram,
+        },
+    )
+
+
+class AgentPool:
+    """A fixed set of agents shared by every request served by this worker.
+
+    Agents are built once, when the application starts, so the chat model,
+    embeddings and Chroma clients (and their HTTP connection pools) are reused
+    across requests. Requests are spread over the pool in round-robin order.
+
+    Attributes:
+        response_cache (ResponseCache | None): The answer cache shared by the agents.
+        scheduler (LLMScheduler | None): The LLM scheduler shared by the agents.
+        agents (list[Agent]): The agents owned by the pool.
+    """
+
+    def __init__(self, size: int = 1):
+        """Build the agents of the pool.
+
+        Args:
+            size (int): Number of agents to build. Defaults to 1.
+
+        Raises:
+            ValueError: If size is lower than 1.
+        """
+        if size < 1:
+            raise ValueError("The agent pool size must be at least 1")
+        self.response_cache = create_response_cache()
+        self.scheduler = create_scheduler()
+        self.agents = [
+            create_agent(response_cache=self.response_cache, scheduler=self.scheduler) for _ in range(size)
+        ]
+        self._next_agent = cycle(self.agents)
+
+    def acquire(self) -> Agent:
+        """Return the next agent of the pool."""
+        return next(self._next_agent)
+
+    async def reload(self) -> bool:
+        """Switch every agent to the published version of the vector database.
+
+        Requests already retrieving context finish on the previous version. The
+        answer cache is cleared, since its answers came from the previous version.
+
+        Returns:
+            bool: True if a new version was loaded.
+        """
+        reloaded = False
+        for agent in self.agents:
+            reloaded = await agent.reload() or reloaded
+        if reloaded and self.response_cache is not None:
+            self.response_cache.invalidate()
+        return reloaded
+
+    async def watch(self, interval: float) -> None:
+        """Reload the pool whenever a new version of the vector database is published.
+
+        Args:
+            interval (float): Seconds between checks of the published version.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reload()
+            except Exception:
+                traceback.print_exc()
+
+    async def aclose(self) -> None:
+        """Release the resources held by every agent of the pool."""
+        for agent in self.agents:
+            await agent.aclose()
+
+
+def get_agent_pool(connection: HTTPConnection) -> AgentPool:
+    """Return the agent pool built in the application lifespan."""
+    return connection.app.state.agent_pool
+
+
+def get_agent(connection: HTTPConnection) -> Agent:
+    """Return a shared agent from the pool built in the application lifespan."""
+    return get_agent_pool(connection).acquire()
+
+
+def get_telegram_queue(connection: HTTPConnection) -> TelegramUpdateQueue:
+    """Return the queue of Telegram updates started in the application lifespan."""
+    return connection.app.state.telegram_queue
+
+
+def get_session_store(connection: HTTPConnection) -> SessionStore:
+    """Return the WebSocket chat sessions of this worker, created in the application lifespan."""
+    return connection.app.state.sessions
@@ -27,3 +27,12 @@ class QueryRequest(BaseModel):
         examples=["Hola, como estas?"],
     )
     history: list[ChatMessage] = Field(..., max_length=50)
+
+
+class SessionMessage(BaseModel):
+    content: str = Field(
+        ...,
+        max_length=500,
+        description="The new message of the user; the history is kept by the server",
+        examples=["Hola, como estas?"],
+    )
@@ -1,6 +1,11 @@
 from fastapi import APIRouter
 
+from .admin import admin_router
 from .chatbot import chatbot_router
+from .metrics import metrics_router
 
 api = APIRouter(prefix="/api")
 api.include_router(chatbot_router)
+api.include_router(admin_router)
+
+__all__ = ["api", "metrics_router"]
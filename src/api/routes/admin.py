@@ -0,0 +1,44 @@
+import secrets
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from src import ENV
+from src.agents.vector_stores.versions import current_version
+from src.api.deps import AgentPool, get_agent_pool
+
+
+def verify_admin_token(authorization: Annotated[str | None, Header()] = None) -> None:
+    """Allow the request only if it carries ``Authorization: Bearer <ADMIN_TOKEN>``.
+
+    The admin endpoints are disabled when ``ADMIN_TOKEN`` is not configured.
+
+    Raises:
+        HTTPException: 404 if the admin endpoints are disabled, 401 if the token is wrong.
+    """
+    if ENV.admin_token is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {ENV.admin_token.get_secret_value()}"
+    if authorization is None or not secrets.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Token de administrador inválido")
+
+
+admin_router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(verify_admin_token)])
+
+
+@admin_router.post("/reload")
+async def reload_vector_db(agent_pool: Annotated[AgentPool, Depends(get_agent_pool)]):
+    """
+    Switches the agents to the published version of the vector database.
+
+    Requests already retrieving context finish on the previous version, which is
+    released once they are done.
+
+    Args:
+        agent_pool (AgentPool): The agents of this worker.
+
+    Returns:
+        dict: Whether a new version was loaded, and the published version.
+    """
+    reloaded = await agent_pool.reload()
+    return {"reloaded": reloaded, "version": current_version(ENV.chroma.persist_directory)}
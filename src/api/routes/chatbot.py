@@ -1,8 +1,6 @@
-import os
-import re
+import asyncio
 import json
-import traceback
-from telegram import Bot
+from contextlib import aclosing
 from json import JSONDecodeError
 from typing import Annotated, Any, Dict
 
@@ -13,22 +11,29 @@ from fastapi import (
     WebSocket,
     WebSocketDisconnect,
 )
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from pydantic import ValidationError
 
-from src.api.deps import get_agent
-from src.api.models import QueryRequest
+from src import ENV
+from src.api.deps import get_agent, get_session_store, get_telegram_queue
+from src.api.models import QueryRequest, SessionMessage
+from src.api.sessions import SessionStore
+from src.api.streaming import SEND_TIME, coalesce_tokens
+from src.api.telegram import TelegramUpdateQueue
 from src.core.agent import Agent
+from src.core.scheduler import SchedulerBusy
 
-def limpiar_markdown(texto: str) -> str:
-    texto = re.sub(r'(\*\*|__|\*|_)', '', texto)
-    texto = re.sub(r'#+\s', '', texto)
-    texto = re.sub(r'^\s*[\*\-]\s*|\d+\.\s*', '', texto, flags=re.MULTILINE)
-    texto = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', texto)
-    return texto.strip()
+chatbot_router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
 
 
-chatbot_router = APIRouter(prefix="/chatbot", tags=["Chatbot"])
+def stream_answer(agent: Agent, query: str, history: list[BaseMessage], token_counts: list[int] | None = None):
+    """Stream the answer of the agent in frames of the size set by the ``STREAM_*`` settings."""
+    return coalesce_tokens(
+        agent.stream(query, history, token_counts=token_counts),
+        max_chars=ENV.stream.max_chars,
+        max_delay=ENV.stream.max_delay,
+        max_pending=ENV.stream.max_pending,
+    )
 
 
 @chatbot_router.websocket("/ws")
@@ -47,6 +52,7 @@ async def websocket_endpoint(
         ValidationError: If the received data is not valid.
         JSONDecodeError: If the received data is not valid JSON.
         WebSocketDisconnect: If the WebSocket connection is disconnected.
+        SchedulerBusy: If the LLM scheduler is too busy; the socket is closed with code 1013.
         Exception: For any unexpected errors.
     """
     await websocket.accept()
@@ -62,8 +68,10 @@ async def websocket_endpoint(
             for msg in query.history
         ]
 
-        async for token in agent.stream(query.content, messages):
-            await websocket.send_text(token)
+        async with aclosing(stream_answer(agent, query.content, messages)) as tokens:
+            async for token in tokens:
+                with SEND_TIME.time():
+                    await websocket.send_text(token)
         await websocket.close()
 
     except ValidationError as e:
@@ -74,6 +82,10 @@ async def websocket_endpoint(
         await websocket.send_text(f"ERROR de decodificación JSON: {e}")
         await websocket.close(code=1003)
 
+    except SchedulerBusy:
+        await websocket.send_text("ERROR: el servicio está ocupado, intenta más tarde.")
+        await websocket.close(code=1013)
+
     except WebSocketDisconnect:
         await websocket.close()
 
@@ -82,38 +94,107 @@ async def websocket_endpoint(
         await websocket.close(code=1011)
 
 
-@chatbot_router.post("/webhook")
-async def telegram_webhook(
-    update: Dict[str, Any],
+@chatbot_router.websocket("/ws/session")
+async def websocket_session(
+    websocket: WebSocket,
     agent: Annotated[Agent, Depends(get_agent)],
+    sessions: Annotated[SessionStore, Depends(get_session_store)],
 ):
+    """
+    Handles a multi-turn chat session over one WebSocket connection.
+
+    Each turn the client sends only its new message, as ``{"content": ...}``. The
+    answer is streamed as ``{"type": "token", "content": ...}`` frames followed by
+    ``{"type": "end"}``, and the server keeps the history of the session. Invalid
+    messages are answered with ``{"type": "error", "detail": ...}`` and the session
+    goes on. The session is closed when the client sends nothing for the idle timeout,
+    and with code 1013 when the LLM scheduler is too busy to take the turn.
+
+    Args:
+        websocket (WebSocket): The WebSocket connection.
+        agent (Agent): The chatbot agent dependency.
+        sessions (SessionStore): The chat sessions of this worker.
+    """
+    await websocket.accept()
+    session = sessions.open()
     try:
-        if not update or "message" not in update or "chat" not in update["message"]:
-            return {"status": "ok", "detail": "Update no válido o sin mensaje."}
+        while True:
+            try:
+                data = await asyncio.wait_for(websocket.receive_json(), sessions.idle_timeout)
+                turn = SessionMessage.model_validate(data)
+            except TimeoutError:
+                await websocket.close(reason="Sesión inactiva.")
+                return
+            except ValidationError as e:
+                await websocket.send_json({"type": "error", "detail": f"ERROR de validación: {e.json()}"})
+                continue
+            except JSONDecodeError as e:
+                await websocket.send_json({"type": "error", "detail": f"ERROR de decodificación JSON: {e}"})
+                continue
+
+            tokens: list[str] = []
+            frames = stream_answer(agent, turn.content, session.messages, session.token_counts)
+            async with aclosing(frames) as stream:
+                async for token in stream:
+                    tokens.append(token)
+                    with SEND_TIME.time():
+                        await websocket.send_json({"type": "token", "content": token})
+            await websocket.send_json({"type": "end"})
+
+            query = HumanMessage(content=turn.content)
+            answer = AIMessage(content="".join(tokens))
+            session.add(query, agent.count_tokens(query))
+            session.add(answer, agent.count_tokens(answer))
+
+    except SchedulerBusy:
+        await websocket.send_json({"type": "error", "detail": "ERROR: el servicio está ocupado, intenta más tarde."})
+        await websocket.close(code=1013)
+
+    except WebSocketDisconnect:
+        pass
+
+    except Exception as e:
+        await websocket.send_json({"type": "error", "detail": f"ERROR inesperado: {str(e)}"})
+        await websocket.close(code=1011)
 
-        message = update["message"]
-        chat_id = message["chat"]["id"]
-        text = message.get("text", "")
+    finally:
+        sessions.close(session)
+
+
+@chatbot_router.post("/webhook")
+async def telegram_webhook(
+    update: Dict[str, Any],
+    updates: Annotated[TelegramUpdateQueue, Depends(get_telegram_queue)],
+):
+    """
+    Validates a Telegram update and queues it to be answered in the background.
 
-        if not text:
-            return {"status": "ok", "detail": "Mensaje de texto vacío."}
+    The webhook answers right away, so Telegram does not retry or throttle it while
+    the agent is generating the reply. Updates delivered again are not answered twice.
 
-        response_de_la_ia = await agent.invoke(text, [])
+    Args:
+        update (Dict[str, Any]): The Telegram update.
+        updates (TelegramUpdateQueue): The queue of updates of this worker.
 
-        texto_para_telegram = limpiar_markdown(response_de_la_ia)
+    Raises:
+        HTTPException: 503 if the queue is full, so Telegram delivers the update later.
+    """
+    if not update or "message" not in update or "chat" not in update["message"]:
+        return {"status": "ok", "detail": "Update no válido o sin mensaje."}
 
-        TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
-        if TELEGRAM_TOKEN:
-            bot = Bot(token=TELEGRAM_TOKEN)
-            await bot.send_message(chat_id=chat_id, text=texto_para_telegram)
-        else:
-            print("ERROR: TELEGRAM_TOKEN no está configurado.")
+    message = update["message"]
+    chat_id = message["chat"]["id"]
+    text = message.get("text", "")
 
-        return {"status": "success"}
+    if not text:
+        return {"status": "ok", "detail": "Mensaje de texto vacío."}
 
-    except Exception as e:
-        print("error")
-        traceback.print_exc()
+    status = updates.submit(chat_id, update)
+    if status == "rejected":
         raise HTTPException(
-            status_code=500, detail=f"Error processing message: {str(e)}"
+            status_code=503,
+            detail="Demasiados mensajes en espera, intenta más tarde.",
+            headers={"Retry-After": "5"},
         )
+
+    return {"status": status}
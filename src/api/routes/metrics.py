@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from src.core.metrics import REGISTRY
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Exposes the metrics of this worker in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The current value of every metric.
+
+    Raises:
+        HTTPException: 404 if the metrics are disabled with ``METRICS_ENABLED``.
+    """
+    if not REGISTRY.enabled:
+        raise HTTPException(status_code=404)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,148 @@
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from itertools import count
+
+from langchain_core.messages import BaseMessage
+
+from ..core.metrics import Gauge
+
+SESSIONS_OPEN = Gauge("websocket_sessions_open", "WebSocket chat sessions currently open.")
+SESSION_HISTORY_BYTES = Gauge("websocket_session_history_bytes", "Bytes of history held by the open chat sessions.")
+
+
+@dataclass
+class _HistoryEntry:
+    message: BaseMessage
+    tokens: int
+    size: int
+
+
+class ChatSession:
+    """The conversation history of a WebSocket session.
+
+    Messages are counted once, when they are added. The history keeps at most
+    ``max_messages`` messages and ``max_tokens`` tokens, dropping the oldest turns
+    first, and always starts on a user message.
+
+    Attributes:
+        id (int): The session number.
+        tokens (int): Tokens of the kept history.
+        size (int): Bytes of the kept history.
+    """
+
+    def __init__(self, store: "SessionStore", id: int):
+        self.id = id
+        self.tokens = 0
+        self.size = 0
+        self._store = store
+        self._entries: deque[_HistoryEntry] = deque()
+
+    @property
+    def messages(self) -> list[BaseMessage]:
+        """The kept history, oldest first."""
+        return [entry.message for entry in self._entries]
+
+    @property
+    def token_counts(self) -> list[int]:
+        """The tokens of each message of the kept history, oldest first."""
+        return [entry.tokens for entry in self._entries]
+
+    def add(self, message: BaseMessage, tokens: int) -> None:
+        """Add a message to the history.
+
+        Args:
+            message (BaseMessage): The user or assistant message.
+            tokens (int): The tokens of the message.
+        """
+        entry = _HistoryEntry(message, tokens, len(str(message.content).encode()))
+        self._entries.append(entry)
+        self.tokens += entry.tokens
+        self.size += entry.size
+        freed = 0
+        while self._entries and (
+            len(self._entries) > self._store.max_messages or self.tokens > self._store.max_tokens
+        ):
+            freed += self._drop_oldest()
+        self._store._account(self, entry.size - freed, active=True)
+
+    def drop_oldest(self) -> None:
+        """Drop the oldest message, and the replies that no longer follow a user message."""
+        self._store._account(self, -self._drop_oldest())
+
+    def _drop_oldest(self) -> int:
+        freed = 0
+        while self._entries:
+            entry = self._entries.popleft()
+            self.tokens -= entry.tokens
+            self.size -= entry.size
+            freed += entry.size
+            if not self._entries or self._entries[0].message.type == "human":
+                break
+        return freed
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SessionStore:
+    """The chat sessions open in the process.
+
+    Each session keeps its own bounded history. Across every session the history
+    is capped at ``max_bytes``; past that, the oldest messages of the least
+    recently active sessions are dropped.
+
+    Attributes:
+        max_messages (int): Maximum number of messages kept per session.
+        max_tokens (int): Maximum number of tokens kept per session.
+        max_bytes (int): Maximum bytes of history across every session.
+        idle_timeout (float): Seconds a session waits for a message before closing.
+        size (int): Bytes of history held by every session.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 50,
+        max_tokens: int = 32768,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_timeout: float = 300.0,
+    ):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self.size = 0
+        self._sessions: OrderedDict[int, ChatSession] = OrderedDict()
+        self._ids = count()
+
+    def open(self) -> ChatSession:
+        """Open a session with an empty history."""
+        session = ChatSession(self, next(self._ids))
+        self._sessions[session.id] = session
+        SESSIONS_OPEN.inc()
+        return session
+
+    def close(self, session: ChatSession) -> None:
+        """Close a session and release its history."""
+        if self._sessions.pop(session.id, None) is None:
+            return
+        self.size -= session.size
+        SESSION_HISTORY_BYTES.dec(session.size)
+        SESSIONS_OPEN.dec()
+
+    def _account(self, session: ChatSession, delta: int, active: bool = False) -> None:
+        if session.id not in self._sessions:
+            return
+        self.size += delta
+        SESSION_HISTORY_BYTES.inc(delta)
+        if active:
+            self._sessions.move_to_end(session.id)
+        if delta <= 0:
+            return
+        for idle in list(self._sessions.values()):
+            while self.size > self.max_bytes and len(idle):
+                idle.drop_oldest()
+            if self.size <= self.max_bytes:
+                break
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,93 @@
+import asyncio
+from contextlib import suppress
+from typing import AsyncIterable, AsyncIterator
+
+from ..core.metrics import FAST_BUCKETS, Counter, Histogram
+
+STREAM_CHUNKS = Counter("stream_chunks_total", "Non-empty chunks streamed by the agent.")
+STREAM_FRAMES = Counter("stream_frames_total", "Frames sent to clients after coalescing the streamed chunks.")
+SEND_TIME = Histogram(
+    "websocket_send_seconds", "Time spent sending a frame to a WebSocket client.", buckets=FAST_BUCKETS
+)
+
+_END = object()
+
+
+async def coalesce_tokens(
+    chunks: AsyncIterable[str],
+    max_chars: int = 64,
+    max_delay: float = 0.05,
+    max_pending: int = 256,
+) -> AsyncIterator[str]:
+    """Join streamed chunks into fewer, larger ones.
+
+    Chunks are buffered until ``max_chars`` characters are waiting or ``max_delay``
+    seconds have passed since the first of them, whichever comes first. Empty
+    chunks are skipped. The source is read ahead by at most ``max_pending`` chunks,
+    so a slow consumer slows down the source instead of buffering its output.
+
+    Use it with ``contextlib.aclosing``, so the source is closed when the consumer
+    stops early.
+
+    Args:
+        chunks (AsyncIterable[str]): The streamed chunks, such as ``Agent.stream``.
+        max_chars (int): Characters that flush the buffer; 1 sends every chunk as is.
+        max_delay (float): Maximum seconds a chunk waits in the buffer.
+        max_pending (int): Maximum number of chunks read ahead of the consumer.
+
+    Yields:
+        str: The joined chunks, never empty.
+    """
+    pending: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    async def read() -> None:
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    STREAM_CHUNKS.inc()
+                    await pending.put(chunk)
+        except Exception as error:
+            await pending.put(error)
+        else:
+            await pending.put(_END)
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    reader = asyncio.create_task(read())
+    loop = asyncio.get_running_loop()
+    buffer: list[str] = []
+    size = 0
+    deadline = 0.0
+    try:
+        while True:
+            try:
+                if buffer:
+                    item = await asyncio.wait_for(pending.get(), max(0.0, deadline - loop.time()))
+                else:
+                    item = await pending.get()
+            except TimeoutError:
+                item = None
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            if item is not None:
+                if not buffer:
+                    deadline = loop.time() + max_delay
+                buffer.append(item)
+                size += len(item)
+                if size < max_chars and loop.time() < deadline:
+                    continue
+            STREAM_FRAMES.inc()
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+        if buffer:
+            STREAM_FRAMES.inc()
+            yield "".join(buffer)
+    finally:
+        reader.cancel()
+        with suppress(asyncio.CancelledError):
+            await reader
@@ -0,0 +1,439 @@
+import asyncio
+import math
+import re
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import aclosing
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Literal
+
+import httpx
+from telegram import Bot
+from telegram.constants import MessageLimit
+from telegram.error import RetryAfter, TelegramError
+from telegram.request import HTTPXRequest
+
+from ..core.metrics import Counter, Gauge, Histogram
+from ..core.scheduler import SchedulerBusy
+
+if TYPE_CHECKING:
+    from .deps import AgentPool
+
+QUEUE_DEPTH = Gauge("telegram_queue_depth", "Telegram updates waiting to be processed.")
+QUEUE_WAIT = Histogram("telegram_queue_wait_seconds", "Time Telegram updates wait in the queue.")
+UPDATES_REJECTED = Counter("telegram_updates_rejected_total", "Telegram updates rejected because the queue was full.")
+UPDATES_PROCESSED = Counter("telegram_updates_processed_total", "Telegram updates processed, by status.")
+PROCESSING_TIME = Histogram("telegram_update_processing_seconds", "Time spent answering a Telegram update.")
+UPDATES_DUPLICATED = Counter("telegram_updates_duplicated_total", "Telegram updates delivered more than once.")
+API_REQUESTS = Counter("telegram_api_requests_total", "Requests sent to the Telegram Bot API.")
+API_CONNECTIONS = Counter(
+    "telegram_api_connections_total",
+    "Connections opened to the Telegram Bot API; the other requests reused a pooled connection.",
+)
+REPLY_TIME = Histogram("telegram_reply_seconds", "Time spent sending or editing a reply on Telegram.")
+FIRST_TEXT_TIME = Histogram(
+    "telegram_first_text_seconds", "Time from taking a Telegram update to the first text shown to the user."
+)
+MESSAGE_EDITS = Counter("telegram_message_edits_total", "Edits of streamed Telegram replies.")
+
+BUSY_REPLY = "Estoy recibiendo muchas consultas en este momento, intenta de nuevo en unos minutos."
+SENTENCE_END = re.compile(r"[.!?…:;](\s|$)|\n")
+
+SubmitResult = Literal["queued", "duplicate", "rejected"]
+
+
+def _limpiar(texto: str) -> str:
+    texto = re.sub(r'(\*\*|__|\*|_)', '', texto)
+    texto = re.sub(r'#+\s', '', texto)
+    texto = re.sub(r'^\s*[\*\-]\s*|\d+\.\s*', '', texto, flags=re.MULTILINE)
+    texto = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', texto)
+    return texto
+
+
+def limpiar_markdown(texto: str) -> str:
+    return _limpiar(texto).strip()
+
+
+class MarkdownCleaner:
+    """Applies ``limpiar_markdown`` to a streamed answer as it grows.
+
+    Complete lines are cleaned once and kept, so each chunk only cleans the line
+    still being written. The result can differ from cleaning the whole answer
+    where markup spans lines, so the final text comes from ``finish``.
+    """
+
+    def __init__(self):
+        self._answer: list[str] = []
+        self._cleaned = ""
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of the answer and return the cleaned text so far."""
+        self._answer.append(chunk)
+        complete, newline, self._pending = (self._pending + chunk).rpartition("\n")
+        if newline:
+            self._cleaned += _limpiar(complete + newline)
+        return (self._cleaned + _limpiar(self._pending)).strip()
+
+    def finish(self) -> str:
+        """Return the whole answer cleaned with ``limpiar_markdown``."""
+        return limpiar_markdown("".join(self._answer))
+
+
+async def _trace(event_name: str, info: dict[str, Any]) -> None:
+    if event_name == "connection.connect_tcp.complete":
+        API_CONNECTIONS.inc()
+
+
+class MeteredTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport that counts the requests and the new connections to the Bot API."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        API_REQUESTS.inc()
+        request.extensions["trace"] = _trace
+        return await super().handle_async_request(request)
+
+
+def create_bot(token: str, pool_size: int = 8) -> Bot:
+    """Create the Telegram bot shared by every reply of the process.
+
+    Its HTTP client keeps up to ``pool_size`` connections to the Bot API open, so
+    replies reuse them instead of paying for a new TLS handshake each time. The bot
+    is used only to send messages, so updates are never polled with it.
+
+    Args:
+        token (str): The Telegram bot token.
+        pool_size (int): Maximum number of connections to the Bot API.
+
+    Returns:
+        Bot: The bot, to be closed with ``close_bot``.
+    """
+    request = HTTPXRequest(
+        connection_pool_size=pool_size,
+        httpx_kwargs={"transport": MeteredTransport(limits=httpx.Limits(max_connections=pool_size))},
+    )
+    return Bot(token=token, request=request, get_updates_request=request)
+
+
+async def close_bot(bot: Bot) -> None:
+    """Close the connections of a bot created with ``create_bot``."""
+    await bot.request.shutdown()
+
+
+def _seconds(retry_after: int | timedelta) -> float:
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class StreamedReply:
+    """A Telegram reply shown while it is generated, by editing the sent messages.
+
+    Text longer than a Telegram message continues in new messages, and messages
+    left over when the text gets shorter are deleted. Edits are limited to one
+    every ``edit_interval`` seconds, and postponed further when Telegram asks the
+    bot to slow down.
+
+    Attributes:
+        bot (Bot): The bot that sends the reply.
+        chat_id (int): The chat being answered.
+        edit_interval (float): Minimum seconds between edits.
+    """
+
+    def __init__(self, bot: Bot, chat_id: int, edit_interval: float = 1.0):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.edit_interval = edit_interval
+        self._messages: list[tuple[int, str]] = []
+        self._next_edit_at = 0.0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._messages)
+
+    async def show(self, text: str) -> None:
+        """Show the text if an edit is allowed now, otherwise skip it.
+
+        An edit that Telegram rejects is skipped as well; ``finish`` shows the final text.
+        """
+        if time.monotonic() < self._next_edit_at:
+            return
+        try:
+            await self._publish(text)
+        except RetryAfter as error:
+            self._next_edit_at = time.monotonic() + _seconds(error.retry_after)
+        except TelegramError:
+            self._next_edit_at = time.monotonic() + self.edit_interval
+
+    async def finish(self, text: str) -> None:
+        """Show the final text, waiting for the rate limits if needed."""
+        delay = self._next_edit_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            await self._publish(text)
+        except RetryAfter as error:
+            await asyncio.sleep(_seconds(error.retry_after))
+            await self._publish(text)
+
+    async def _publish(self, text: str) -> None:
+        limit = MessageLimit.MAX_TEXT_LENGTH
+        parts = [text[start : start + limit] for start in range(0, len(text), limit)]
+        for index, part in enumerate(parts):
+            started_at = time.perf_counter()
+            if index == len(self._messages):
+                message = await self.bot.send_message(chat_id=self.chat_id, text=part)
+                self._messages.append((message.message_id, part))
+            elif self._messages[index][1] != part:
+                message_id = self._messages[index][0]
+                await self.bot.edit_message_text(text=part, chat_id=self.chat_id, message_id=message_id)
+                self._messages[index] = (message_id, part)
+                MESSAGE_EDITS.inc()
+            else:
+                continue
+            REPLY_TIME.observe(time.perf_counter() - started_at)
+        while len(self._messages) > len(parts):
+            started_at = time.perf_counter()
+            await self.bot.delete_message(chat_id=self.chat_id, message_id=self._messages[-1][0])
+            self._messages.pop()
+            REPLY_TIME.observe(time.perf_counter() - started_at)
+        self._next_edit_at = time.monotonic() + self.edit_interval
+
+
+async def stream_update(
+    update: dict[str, Any],
+    agent_pool: "AgentPool",
+    bot: Bot,
+    edit_interval: float = 1.0,
+) -> None:
+    """Answer the text message of a Telegram update while the agent streams it.
+
+    The first message is sent as soon as the first sentence is complete, and is
+    then edited as the rest of the answer arrives.
+
+    Args:
+        update (dict[str, Any]): A Telegram update with a text message.
+        agent_pool (AgentPool): The agents of this worker.
+        bot (Bot): The bot that sends the reply.
+        edit_interval (float): Minimum seconds between edits of the reply.
+    """
+    message = update["message"]
+    started_at = time.perf_counter()
+    reply = StreamedReply(bot, message["chat"]["id"], edit_interval)
+    cleaner = MarkdownCleaner()
+
+    try:
+        async with aclosing(agent_pool.acquire().stream(message["text"], [], platform="telegram")) as chunks:
+            async for chunk in chunks:
+                text = cleaner.feed(chunk)
+                if not text or (not reply.started and not SENTENCE_END.search(text)):
+                    continue
+                was_started = reply.started
+                await reply.show(text)
+                if not was_started and reply.started:
+                    FIRST_TEXT_TIME.observe(time.perf_counter() - started_at)
+        text = cleaner.finish()
+    except SchedulerBusy:
+        text = BUSY_REPLY
+
+    if not text:
+        return
+    was_started = reply.started
+    await reply.finish(text)
+    if not was_started:
+        FIRST_TEXT_TIME.observe(time.perf_counter() - started_at)
+
+
+async def answer_update(update: dict[str, Any], agent_pool: "AgentPool", bot: Bot) -> None:
+    """Answer the text message of a Telegram update with the agent.
+
+    Args:
+        update (dict[str, Any]): A Telegram update with a text message.
+        agent_pool (AgentPool): The agents of this worker.
+        bot (Bot): The bot that sends the reply.
+    """
+    message = update["message"]
+    chat_id = message["chat"]["id"]
+
+    try:
+        response_de_la_ia = await agent_pool.acquire().invoke(message["text"], [], platform="telegram")
+        texto_para_telegram = limpiar_markdown(response_de_la_ia)
+    except SchedulerBusy:
+        texto_para_telegram = BUSY_REPLY
+
+    started_at = time.perf_counter()
+    await bot.send_message(chat_id=chat_id, text=texto_para_telegram)
+    REPLY_TIME.observe(time.perf_counter() - started_at)
+
+
+class UpdateDeduplicator:
+    """Tracks the ``update_id`` of the Telegram updates being answered or recently answered.
+
+    Telegram delivers an update again when the webhook is slow or fails. The first
+    delivery claims the update; while it is being answered, later deliveries get the
+    future of the original instead of starting new work, and once it is answered
+    they are recognized for ``ttl`` seconds. At most ``max_entries`` answered updates
+    are remembered, the oldest being forgotten first.
+
+    Attributes:
+        max_entries (int): Maximum number of answered updates remembered.
+        ttl (float): Seconds an answered update is remembered.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._in_flight: dict[int, asyncio.Future[None]] = {}
+        self._answered: OrderedDict[int, float] = OrderedDict()
+
+    def claim(self, update_id: int) -> asyncio.Future[None] | None:
+        """Claim an update before answering it.
+
+        Args:
+            update_id (int): The ``update_id`` of the update.
+
+        Returns:
+            asyncio.Future[None] | None: None if the caller must answer the update,
+            otherwise the future of the original delivery, already done if it was answered.
+        """
+        if update_id in self._in_flight:
+            return self._in_flight[update_id]
+        expires_at = self._answered.get(update_id)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(None)
+                return future
+            del self._answered[update_id]
+        self._in_flight[update_id] = asyncio.get_running_loop().create_future()
+        return None
+
+    def release(self, update_id: int) -> None:
+        """Forget a claim whose update will not be answered, so a new delivery is answered."""
+        future = self._in_flight.pop(update_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+
+    def complete(self, update_id: int) -> None:
+        """Mark a claimed update as answered, successfully or not."""
+        future = self._in_flight.pop(update_id, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+        now = time.monotonic()
+        self._answered[update_id] = now + self.ttl
+        self._answered.move_to_end(update_id)
+        while self._answered and (
+            len(self._answered) > self.max_entries or next(iter(self._answered.values())) <= now
+        ):
+            self._answered.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._in_flight) + len(self._answered)
+
+
+class TelegramUpdateQueue:
+    """Bounded queues of Telegram updates answered by a fixed set of workers.
+
+    Updates are sharded by chat, each shard being served by a single worker, so the
+    messages of a chat are answered in order while different chats are answered
+    concurrently. When the shard of a chat is full the update is rejected, so the
+    webhook can shed load instead of piling up work it cannot finish. Updates that
+    Telegram delivers again are recognized by their ``update_id`` and not answered twice.
+
+    Attributes:
+        handler (Callable): Coroutine function that answers one update.
+        workers (int): Number of workers, and of shards.
+        queue_size (int): Maximum number of waiting updates, split across the shards.
+        deduplicator (UpdateDeduplicator): The updates being answered or recently answered.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict[str, Any]], Awaitable[None]],
+        workers: int = 4,
+        queue_size: int = 256,
+        deduplicator: UpdateDeduplicator | None = None,
+    ):
+        """Create the queues of the workers.
+
+        Raises:
+            ValueError: If workers or queue_size is lower than 1.
+        """
+        if workers < 1 or queue_size < 1:
+            raise ValueError("The Telegram workers and queue size must be at least 1")
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.deduplicator = deduplicator if deduplicator is not None else UpdateDeduplicator()
+        shard_size = math.ceil(queue_size / workers)
+        self._queues: list[asyncio.Queue[tuple[dict[str, Any], float]]] = [
+            asyncio.Queue(maxsize=shard_size) for _ in range(workers)
+        ]
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._tasks = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+
+    def submit(self, chat_id: int, update: dict[str, Any]) -> SubmitResult:
+        """Queue an update without waiting.
+
+        Args:
+            chat_id (int): The chat of the update, which selects its shard.
+            update (dict[str, Any]): The update to answer.
+
+        Returns:
+            SubmitResult: ``queued``; ``duplicate`` if the same ``update_id`` is being or
+            was recently answered; or ``rejected`` if the shard of the chat is full.
+        """
+        update_id = update.get("update_id")
+        if update_id is not None and self.deduplicator.claim(update_id) is not None:
+            UPDATES_DUPLICATED.inc()
+            return "duplicate"
+        queue = self._queues[hash(chat_id) % self.workers]
+        try:
+            queue.put_nowait((update, time.perf_counter()))
+        except asyncio.QueueFull:
+            if update_id is not None:
+                self.deduplicator.release(update_id)
+            UPDATES_REJECTED.inc()
+            return "rejected"
+        QUEUE_DEPTH.inc()
+        return "queued"
+
+    def depth(self) -> int:
+        """Return the number of updates waiting in every shard."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    async def _work(self, queue: asyncio.Queue[tuple[dict[str, Any], float]]) -> None:
+        while True:
+            update, enqueued_at = await queue.get()
+            QUEUE_DEPTH.dec()
+            started_at = time.perf_counter()
+            QUEUE_WAIT.observe(started_at - enqueued_at)
+            status = "success"
+            try:
+                await self.handler(update)
+            except Exception:
+                status = "error"
+                traceback.print_exc()
+            finally:
+                if update.get("update_id") is not None:
+                    self.deduplicator.complete(update["update_id"])
+                queue.task_done()
+                UPDATES_PROCESSED.inc(status=status)
+                PROCESSING_TIME.observe(time.perf_counter() - started_at)
+
+    async def aclose(self, drain_timeout: float = 10.0) -> None:
+        """Wait for the queued updates to be answered, then stop the workers.
+
+        Args:
+            drain_timeout (float): Seconds to wait for the queues to drain.
+        """
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), drain_timeout)
+        except TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
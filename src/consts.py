@@ -8,3 +8,12 @@ class DocType(Enum):
     CALENDAR = "calendar"
     CANDIDATES = "candidates"
     Q_A = "questions_and_answers"
+
+
+# Name of the mixed collection holding every document, used for classification.
+COLLECTION_NAME = "langchain"
+
+
+def type_collection_name(doc_type: DocType) -> str:
+    """Return the name of the collection holding only the documents of a type."""
+    return f"{COLLECTION_NAME}_{doc_type.value}"
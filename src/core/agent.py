@@ -1,12 +1,22 @@
+import time
 from abc import ABC
-from typing import Literal, Sequence
+from contextlib import AbstractAsyncContextManager, nullcontext
+from typing import Sequence
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import BaseMessage
 
-from src.core.conts import THINK_TAGS
-
 from .entities.context_manager import ContextManager
+from .metrics import Counter, Histogram
+from .response_cache import ResponseCache, split_stream_chunks
+from .scheduler import LLMScheduler, Platform
+from .think_filter import ThinkTagFilter
+
+REASONING_DROPPED = Counter(
+    "agent_reasoning_chars_dropped_total", "Characters of reasoning inside think tags removed from the answers."
+)
+FIRST_TOKEN_TIME = Histogram("llm_time_to_first_token_seconds", "Time from the LLM request to its first chunk.")
+STREAM_TIME = Histogram("agent_stream_seconds", "Total time of the streamed answers, by how they were answered.")
 
 
 class Agent(ABC):
@@ -19,56 +29,149 @@ class Agent(ABC):
     Attributes:
         chat_model (BaseChatModel): The language model used for generating responses.
         context_manager (ContextManager): Manager for retrieving and handling context.
+        response_cache (ResponseCache | None): Optional semantic cache of final answers.
+        scheduler (LLMScheduler | None): Optional admission control of the LLM requests.
     """
 
-    def __init__(self, chat_model: BaseChatModel, context_manager: ContextManager):
+    def __init__(
+        self,
+        chat_model: BaseChatModel,
+        context_manager: ContextManager,
+        response_cache: ResponseCache | None = None,
+        scheduler: LLMScheduler | None = None,
+    ):
         """Initialize the Agent with a chat model and context manager.
 
         Args:
             chat_model (BaseChatModel): The language model to use for responses.
             context_manager (ContextManager): The manager for handling context retrieval.
+            response_cache (ResponseCache | None): Cache of final answers for queries
+                without history. Defaults to None.
+            scheduler (LLMScheduler | None): Scheduler shared by the agents of the
+                process, limiting the concurrent LLM requests. Defaults to None.
         """
         self.chat_model = chat_model
         self.context_manager = context_manager
+        self.response_cache = response_cache
+        self.scheduler = scheduler
+
+    def _llm_slot(self, platform: Platform) -> AbstractAsyncContextManager:
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(platform)
+
+    async def _cache_key(self, query: str, history: Sequence[BaseMessage] | None) -> list[float] | None:
+        """Return the embedding used to look up the query in the response cache.
+
+        Only queries without history are cached, since follow-up questions
+        depend on the rest of the conversation.
+        """
+        if self.response_cache is None or history:
+            return None
+        return await self.context_manager.embed_query(query)
 
-    async def stream(self, query: str, history: Sequence[BaseMessage]):
+    def _lookup_answer(self, cache_key: list[float] | None) -> str | None:
+        if cache_key is None or self.response_cache is None:
+            return None
+        return self.response_cache.lookup(cache_key)
+
+    def _store_answer(self, cache_key: list[float] | None, answer: str) -> None:
+        if cache_key is not None and self.response_cache is not None:
+            self.response_cache.store(cache_key, answer)
+
+    async def stream(
+        self,
+        query: str,
+        history: Sequence[BaseMessage],
+        platform: Platform = "web",
+        token_counts: Sequence[int] | None = None,
+    ):
         """Stream response chunks for a given query and chat history.
 
         This method retrieves relevant context using the context manager,
-        then streams chunks from the chat model while filtering out
-        think tags from the output.
+        then streams chunks from the chat model while dropping the reasoning
+        inside think tags. Chunks left empty are not yielded.
 
         Args:
             query (str): The user's query to process.
             history (BaseChatMessageHistory): The chat history for context.
+            platform (Platform): The platform of the user, which sets the priority
+                of the request in the scheduler.
+            token_counts (Sequence[int] | None): The tokens of the history messages,
+                when already counted, so they are not counted again.
 
         Yields:
             str: Response chunks as they become available.
+
+        Raises:
+            SchedulerBusy: If the scheduler rejects the request.
         """
-        messages = await self.context_manager.retrieve_context(query, history)
-        async for chunk in self.chat_model.astream(messages):
-            output = str(chunk.content)
-            output = output.replace(THINK_TAGS[0], "").replace(THINK_TAGS[1], "")
-            yield output
+        started_at = time.perf_counter()
+        source = "llm"
+        try:
+            direct_answer = await self.context_manager.lookup_answer(query)
+            if direct_answer is not None:
+                source = "faq"
+                for output in split_stream_chunks(direct_answer):
+                    yield output
+                return
+
+            cache_key = await self._cache_key(query, history)
+            cached_answer = self._lookup_answer(cache_key)
+            if cached_answer is not None:
+                source = "cache"
+                for output in split_stream_chunks(cached_answer):
+                    yield output
+                return
+
+            outputs: list[str] = []
+            think_filter = ThinkTagFilter()
+            async with self._llm_slot(platform):
+                messages = await self.context_manager.retrieve_context(query, history, token_counts)
+                requested_at: float | None = time.perf_counter()
+                try:
+                    async for chunk in self.chat_model.astream(messages):
+                        if requested_at is not None:
+                            FIRST_TOKEN_TIME.observe(time.perf_counter() - requested_at)
+                            requested_at = None
+                        output = think_filter.feed(str(chunk.content))
+                        if output:
+                            outputs.append(output)
+                            yield output
+                    output = think_filter.flush()
+                    if output:
+                        outputs.append(output)
+                        yield output
+                finally:
+                    REASONING_DROPPED.inc(think_filter.dropped)
+
+            self._store_answer(cache_key, "".join(outputs))
+        finally:
+            STREAM_TIME.observe(time.perf_counter() - started_at, source=source)
 
     async def invoke(
         self,
         query: str,
         history: Sequence[BaseMessage],
-        platform: Literal["telegram", "whatsapp", "web"] = "web",
+        platform: Platform = "web",
     ) -> str:
         """Process a query and generate a response using context-aware reasoning.
 
         Retrieves relevant context based on the query and conversation history,
-        then uses the chat model to generate a response. Removes thinking tags
-        from the final output to provide clean responses.
+        then uses the chat model to generate a response. Removes the reasoning
+        inside think tags from the final output to provide clean responses.
 
         Args:
             query (str): The user's query or question to process
             history (list[BaseMessage]): Conversation history with previous messages
+            platform (Platform): The platform of the user, which sets the priority
+                of the request in the scheduler
 
         Returns:
-            str: The generated response text with thinking tags removed
+            str: The generated response text with the reasoning removed
+
+        Raises:
+            SchedulerBusy: If the scheduler rejects the request.
 
         Example:
             >>> agent = Agent()
@@ -76,6 +179,41 @@ class Agent(ABC):
             >>> print(response)
             "AI stands for Artificial Intelligence..."
         """
-        messages = await self.context_manager.retrieve_context(query, history)
-        output = await self.chat_model.ainvoke(messages)
-        return str(output.content).replace(THINK_TAGS[0], "").replace(THINK_TAGS[1], "")
+        direct_answer = await self.context_manager.lookup_answer(query)
+        if direct_answer is not None:
+            return direct_answer
+
+        cache_key = await self._cache_key(query, history)
+        cached_answer = self._lookup_answer(cache_key)
+        if cached_answer is not None:
+            return cached_answer
+
+        async with self._llm_slot(platform):
+            messages = await self.context_manager.retrieve_context(query, history)
+            output = await self.chat_model.ainvoke(messages)
+        think_filter = ThinkTagFilter()
+        answer = think_filter.feed(str(output.content)) + think_filter.flush()
+        REASONING_DROPPED.inc(think_filter.dropped)
+
+        self._store_answer(cache_key, answer)
+        return answer
+
+    def count_tokens(self, message: BaseMessage) -> int:
+        """Count the tokens of a message as the context manager does when trimming the history."""
+        return self.context_manager.count_tokens(message)
+
+    async def reload(self) -> bool:
+        """Switch the context manager to the latest published knowledge base.
+
+        Returns:
+            bool: True if a new version was loaded.
+        """
+        return await self.context_manager.reload()
+
+    async def aclose(self) -> None:
+        """Release the resources held by the agent.
+
+        The chat model HTTP clients are shared by the provider integrations
+        across the process, so only the context manager is closed here.
+        """
+        await self.context_manager.aclose()
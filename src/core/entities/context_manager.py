@@ -10,6 +10,7 @@ class ContextManager(ABC):
         self,
         query: str,
         history: Sequence[BaseMessage],
+        token_counts: Sequence[int] | None = None,
     ) -> list[BaseMessage]:
         pass
 
@@ -20,5 +21,30 @@ class ContextManager(ABC):
         pass
 
     @abstractmethod
-    async def trim_context(self, context: list[BaseMessage]) -> list[BaseMessage]:
+    async def embed_query(self, query: str) -> list[float]:
         pass
+
+    @abstractmethod
+    async def trim_context(
+        self, context: list[BaseMessage], token_counts: Sequence[int] | None = None
+    ) -> list[BaseMessage]:
+        pass
+
+    def count_tokens(self, message: BaseMessage) -> int:
+        """Count the tokens of a message, approximated as four characters per token."""
+        return len(str(message.content)) // 4 + 1
+
+    async def lookup_answer(self, query: str) -> str | None:
+        """Return a final answer for the query that makes the LLM call unnecessary, if any."""
+        return None
+
+    async def reload(self) -> bool:
+        """Switch to the latest published version of the knowledge base, if any.
+
+        Returns:
+            True if a new version was loaded.
+        """
+        return False
+
+    async def aclose(self) -> None:
+        """Release the resources held by the context manager."""
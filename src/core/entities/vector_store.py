@@ -1,15 +1,48 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+
+from langchain_core.documents import Document
+
 
 class VectorStoreManager(ABC):
+    """Retrieval backend searched by the context managers with precomputed query vectors."""
+
     @abstractmethod
-    def retrieve_context(self, query: str) -> str:
-        pass
+    def batch_search(
+        self,
+        embeddings: list[list[float]],
+        k: int,
+        doc_type: str | None = None,
+        score_threshold: float | None = None,
+    ) -> list[list[Document]]:
+        """Search the store with several query vectors at once.
+
+        Args:
+            embeddings: The query vectors.
+            k: Maximum number of documents returned per query.
+            doc_type: Only return documents with this ``type`` metadata.
+            score_threshold: When given, drop documents whose relevance score is lower.
+
+        Returns:
+            The matching documents of each query, most similar first.
+        """
+
+    def search(
+        self,
+        embedding: list[float],
+        k: int,
+        doc_type: str | None = None,
+        score_threshold: float | None = None,
+    ) -> list[Document]:
+        """Search the store with a single query vector. See ``batch_search``."""
+        return self.batch_search([embedding], k, doc_type=doc_type, score_threshold=score_threshold)[0]
 
     @abstractmethod
-    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+    def add_documents(self, documents: list[Document], ids: list[str] | None = None) -> None:
         pass
 
     @abstractmethod
-    def delete_documents(self, document_ids: List[str]) -> None:
+    def delete_documents(self, document_ids: list[str]) -> None:
         pass
+
+    def close(self) -> None:
+        """Release the resources held by the store."""
@@ -0,0 +1,132 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import count
+
+import numpy as np
+
+STREAM_CHUNK_PATTERN = re.compile(r"\S+\s*|\s+")
+
+
+def split_stream_chunks(text: str) -> list[str]:
+    """Split a text into word-sized chunks to stream it like model tokens."""
+    return STREAM_CHUNK_PATTERN.findall(text)
+
+
+@dataclass
+class _CachedAnswer:
+    vector: np.ndarray
+    answer: str
+    expires_at: float
+
+
+class ResponseCache:
+    """A semantic cache of final answers keyed by query embedding.
+
+    A lookup returns the answer of the most similar cached query when its cosine
+    similarity is above the threshold. Entries expire after a TTL and the least
+    recently used ones are evicted when the cache is full. The owner of the cache
+    calls ``invalidate`` when it switches to a new version of the vector database,
+    so answers never outlive the version they were built from.
+
+    Attributes:
+        threshold (float): Minimum cosine similarity for a cached answer to be returned.
+        max_entries (int): Maximum number of cached answers.
+        ttl (float): Seconds an answer stays valid after being stored.
+        hits (int): Number of lookups answered by the cache.
+        misses (int): Number of lookups without a similar enough answer.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl: float = 3600.0,
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, _CachedAnswer] = OrderedDict()
+        self._ids = count()
+        self._matrix: np.ndarray | None = None
+        self._matrix_ids: list[int] = []
+        self._lock = threading.Lock()
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._matrix = None
+        self._matrix_ids = []
+
+    def _remove_expired(self, now: float) -> None:
+        expired = [entry_id for entry_id, entry in self._entries.items() if entry.expires_at <= now]
+        for entry_id in expired:
+            del self._entries[entry_id]
+        if expired:
+            self._matrix = None
+
+    @staticmethod
+    def _normalize(vector: list[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def lookup(self, vector: list[float]) -> str | None:
+        """Return the cached answer of the most similar query, if similar enough.
+
+        Args:
+            vector: The embedding of the incoming query.
+
+        Returns:
+            The cached answer, or None on a miss.
+        """
+        with self._lock:
+            self._remove_expired(time.monotonic())
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._matrix_ids = list(self._entries)
+                self._matrix = np.stack([self._entries[entry_id].vector for entry_id in self._matrix_ids])
+
+            similarities = self._matrix @ self._normalize(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entry_id = self._matrix_ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return self._entries[entry_id].answer
+
+    def store(self, vector: list[float], answer: str) -> None:
+        """Cache the final answer of a query.
+
+        Args:
+            vector: The embedding of the query.
+            answer: The final answer text.
+        """
+        if self.max_entries <= 0 or not answer.strip():
+            return
+        with self._lock:
+            self._entries[next(self._ids)] = _CachedAnswer(
+                vector=self._normalize(vector),
+                answer=answer,
+                expires_at=time.monotonic() + self.ttl,
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def invalidate(self) -> None:
+        """Drop every cached answer."""
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict[str, int]:
+        """Return the cache counters."""
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,110 @@
+import asyncio
+import heapq
+import time
+from contextlib import asynccontextmanager
+from itertools import count
+from typing import AsyncIterator, Literal
+
+from .metrics import Counter, Gauge, Histogram
+
+Platform = Literal["telegram", "whatsapp", "web"]
+
+ACTIVE_REQUESTS = Gauge("llm_requests_active", "LLM requests holding a scheduler slot.")
+WAITING_REQUESTS = Gauge("llm_requests_waiting", "LLM requests waiting for a scheduler slot.")
+QUEUE_WAIT = Histogram("llm_queue_wait_seconds", "Time LLM requests wait for a scheduler slot, by platform.")
+REJECTED_REQUESTS = Counter("llm_requests_rejected_total", "LLM requests rejected by the scheduler, by reason.")
+
+
+class SchedulerBusy(Exception):
+    """Raised when the scheduler cannot take a request: its queue is full or the wait was too long."""
+
+
+class LLMScheduler:
+    """Admission control for the requests sent to the LLM provider.
+
+    At most ``max_concurrency`` requests run at once. Further requests wait in a
+    queue of ``max_queue`` places and get the next free slot by platform priority,
+    lower values first, then in arrival order. A request is rejected right away
+    when the queue is full, and after ``max_wait`` seconds if no slot freed up.
+
+    Attributes:
+        max_concurrency (int): Maximum number of requests running at once.
+        max_queue (int): Maximum number of requests waiting for a slot.
+        max_wait (float): Maximum seconds a request waits for a slot.
+        priorities (dict[str, int]): Priority of each platform; lower runs first.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        max_queue: int = 64,
+        max_wait: float = 30.0,
+        priorities: dict[str, int] | None = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("The scheduler concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.priorities = priorities if priorities is not None else {"web": 0, "whatsapp": 1, "telegram": 2}
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._order = count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(not future.done() for _, _, future in self._waiters)
+
+    @asynccontextmanager
+    async def slot(self, platform: Platform = "web") -> AsyncIterator[None]:
+        """Hold a slot while the LLM request runs.
+
+        Args:
+            platform (Platform): The platform of the request, which sets its priority.
+
+        Raises:
+            SchedulerBusy: If the queue is full or no slot freed up in time.
+        """
+        await self._acquire(platform)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, platform: Platform) -> None:
+        if self.active < self.max_concurrency and not self.waiting:
+            self.active += 1
+            ACTIVE_REQUESTS.inc()
+            QUEUE_WAIT.observe(0.0, platform=platform)
+            return
+        if self.waiting >= self.max_queue:
+            REJECTED_REQUESTS.inc(platform=platform, reason="queue_full")
+            raise SchedulerBusy("Too many requests are waiting for the LLM")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (self.priorities.get(platform, len(self.priorities)), next(self._order), future))
+        WAITING_REQUESTS.inc()
+        started_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except TimeoutError:
+            if not future.done():
+                future.cancel()
+                REJECTED_REQUESTS.inc(platform=platform, reason="deadline")
+                raise SchedulerBusy("No LLM slot freed up in time") from None
+        except asyncio.CancelledError:
+            if not future.cancel():
+                self._release()
+            raise
+        finally:
+            WAITING_REQUESTS.dec()
+        QUEUE_WAIT.observe(time.perf_counter() - started_at, platform=platform)
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+        ACTIVE_REQUESTS.dec()
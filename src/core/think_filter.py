@@ -0,0 +1,65 @@
+from .conts import THINK_TAGS
+
+
+def _partial_tag_length(text: str, tags: tuple[str, ...]) -> int:
+    """Return the length of the longest end of ``text`` that could start one of the tags."""
+    for length in range(min(len(text), max(map(len, tags)) - 1), 0, -1):
+        if any(tag.startswith(text[-length:]) for tag in tags):
+            return length
+    return 0
+
+
+class ThinkTagFilter:
+    """Removes the reasoning blocks of an answer, also when it arrives in chunks.
+
+    Everything between an opening and a closing think tag is dropped, including
+    tags split across chunks: the end of a chunk that could start a tag is held
+    back until the next chunk tells. A closing tag without an opening one is
+    removed as well. Call ``flush`` after the last chunk.
+
+    Attributes:
+        dropped (int): Characters of reasoning dropped so far, tags excluded.
+    """
+
+    def __init__(self, tags: tuple[str, str] = (THINK_TAGS[0], THINK_TAGS[1])):
+        self.open_tag, self.close_tag = tags
+        self.dropped = 0
+        self._inside = False
+        self._held = ""
+
+    def feed(self, chunk: str) -> str:
+        """Filter the next chunk.
+
+        Returns:
+            str: The visible text of the chunk, possibly empty.
+        """
+        text = self._held + chunk
+        self._held = ""
+        visible: list[str] = []
+        while text:
+            tags = (self.close_tag,) if self._inside else (self.open_tag, self.close_tag)
+            found = [(index, tag) for tag in tags if (index := text.find(tag)) >= 0]
+            if found:
+                index, tag = min(found)
+                self._keep(text[:index], visible)
+                self._inside = tag == self.open_tag
+                text = text[index + len(tag) :]
+                continue
+            held = _partial_tag_length(text, tags)
+            self._keep(text[: len(text) - held], visible)
+            self._held = text[len(text) - held :]
+            break
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """Return the text held back at the end of the answer, unless it is reasoning."""
+        held, self._held = self._held, ""
+        visible: list[str] = []
+        self._keep(held, visible)
+        return "".join(visible)
+
+    def _keep(self, text: str, visible: list[str]) -> None:
+        if self._inside:
+            self.dropped += len(text)
+        elif text:
+            visible.append(text)
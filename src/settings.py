@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Literal
 
 from pydantic import BaseModel, SecretStr, field_validator
 from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
@@ -22,6 +22,64 @@ class GoogleConfig(BaseModel):
 
 class ChromaConfig(BaseModel):
     persist_directory: str
+    watch_interval: float = 5.0
+
+
+class AgentConfig(BaseModel):
+    pool_size: int = 1
+
+
+class BotConfig(BaseModel):
+    workers: int = 4
+    queue_size: int = 256
+    drain_timeout: float = 10.0
+    dedup_max_entries: int = 10_000
+    dedup_ttl: float = 600.0
+    pool_size: int = 8
+    streaming: bool = False
+    edit_interval: float = 1.0
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = True
+
+
+class SchedulerConfig(BaseModel):
+    max_concurrency: int = 16
+    max_queue: int = 64
+    max_wait: float = 30.0
+    priority_web: int = 0
+    priority_whatsapp: int = 1
+    priority_telegram: int = 2
+
+
+class SessionConfig(BaseModel):
+    idle_timeout: float = 300.0
+    max_messages: int = 50
+    max_bytes: int = 64 * 1024 * 1024
+
+
+class StreamConfig(BaseModel):
+    max_chars: int = 64
+    max_delay: float = 0.05
+    max_pending: int = 256
+
+
+class RetrievalConfig(BaseModel):
+    backend: Literal["chroma", "numpy"] = "chroma"
+    per_type_collections: bool = True
+    faq_index: bool = True
+    faq_skip_llm: bool = False
+
+
+class CacheConfig(BaseModel):
+    emb_max_entries: int = 10_000
+    emb_max_bytes: int = 64 * 1024 * 1024
+    emb_ttl: float = 3600.0
+    response_enabled: bool = False
+    response_threshold: float = 0.95
+    response_max_entries: int = 1000
+    response_ttl: float = 3600.0
 
 
 class Settings(BaseSettings):
@@ -31,10 +89,19 @@ class Settings(BaseSettings):
     # env vars
     llm: LLMConfig
     chroma: ChromaConfig
+    agent: AgentConfig = AgentConfig()
+    bot: BotConfig = BotConfig()
+    session: SessionConfig = SessionConfig()
+    stream: StreamConfig = StreamConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    cache: CacheConfig = CacheConfig()
+    retrieval: RetrievalConfig = RetrievalConfig()
     google: GoogleConfig
     allow_origins: Annotated[list[str], NoDecode]
     telegram_token: SecretStr
     chekibot_api: str
+    admin_token: SecretStr | None = None
 
     # model configurations
     model_config = SettingsConfigDict(
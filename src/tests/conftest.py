@@ -0,0 +1,32 @@
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.agents.context_managers import chroma_cm
+
+
+class WordEncoding:
+    """Counts one token per word, so tests never download the tiktoken encoding."""
+
+    def encode(self, text: str) -> list[str]:
+        return text.split()
+
+
+class RecordingEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic fake embeddings that record the texts of every ``embed_documents`` call."""
+
+    calls: list[list[str]]
+
+    def __init__(self, size: int = 4):
+        super().__init__(size=size, calls=[])
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def word_encoding(monkeypatch):
+    monkeypatch.setattr(chroma_cm, "_encoding", WordEncoding)
+    chroma_cm._count_tokens.cache_clear()
+    yield
+    chroma_cm._count_tokens.cache_clear()
@@ -0,0 +1,46 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import SecretStr
+
+from src import ENV
+from src.api.app import create_app
+from src.api.deps import get_agent_pool
+
+agent_pool = MagicMock(reload=AsyncMock(return_value=True))
+
+app = create_app()
+app.dependency_overrides[get_agent_pool] = lambda: agent_pool
+
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(ENV, "admin_token", SecretStr("secreto"))
+
+
+def test_reload_is_disabled_without_admin_token(monkeypatch):
+    monkeypatch.setattr(ENV, "admin_token", None)
+
+    response = client.post("/api/admin/reload", headers={"Authorization": "Bearer secreto"})
+
+    assert response.status_code == 404
+
+
+def test_reload_rejects_wrong_token(admin_token):
+    response = client.post("/api/admin/reload", headers={"Authorization": "Bearer otro"})
+
+    assert response.status_code == 401
+
+
+def test_reload_switches_agents(admin_token):
+    agent_pool.reload.reset_mock()
+
+    response = client.post("/api/admin/reload", headers={"Authorization": "Bearer secreto"})
+
+    assert response.status_code == 200
+    assert response.json()["reloaded"] is True
+    agent_pool.reload.assert_awaited_once()
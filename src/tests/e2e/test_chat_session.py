@@ -0,0 +1,82 @@
+import pytest
+from fastapi import WebSocketDisconnect
+from fastapi.testclient import TestClient
+
+from src.api.app import create_app
+from src.api.deps import get_agent, get_session_store
+from src.api.sessions import SessionStore
+from src.core.agent import Agent
+
+
+class MockAgent(Agent):
+    def __init__(self):
+        self.histories = []
+        self.token_counts = []
+
+    async def stream(self, query: str, history, token_counts=None):
+        self.histories.append([message.content for message in history])
+        self.token_counts.append(token_counts)
+        for chunk in ["Respuesta ", "a ", query]:
+            yield chunk
+
+    def count_tokens(self, message) -> int:
+        return len(str(message.content).split())
+
+
+agent = MockAgent()
+sessions = SessionStore(max_messages=4, idle_timeout=0.5)
+
+app = create_app()
+app.dependency_overrides[get_agent] = lambda: agent
+app.dependency_overrides[get_session_store] = lambda: sessions
+
+
+client = TestClient(app)
+
+
+def receive_answer(websocket) -> str:
+    answer = ""
+    while (frame := websocket.receive_json())["type"] == "token":
+        answer += frame["content"]
+    assert frame == {"type": "end"}
+    return answer
+
+
+def test_session_keeps_history_across_turns():
+    agent.histories.clear()
+    agent.token_counts.clear()
+    with client.websocket_connect("/api/chatbot/ws/session") as websocket:
+        websocket.send_json({"content": "uno"})
+        assert receive_answer(websocket) == "Respuesta a uno"
+        websocket.send_json({"content": "dos"})
+        assert receive_answer(websocket) == "Respuesta a dos"
+        websocket.send_json({"content": "tres"})
+        assert receive_answer(websocket) == "Respuesta a tres"
+
+    assert agent.histories == [
+        [],
+        ["uno", "Respuesta a uno"],
+        ["uno", "Respuesta a uno", "dos", "Respuesta a dos"],
+    ]
+    assert agent.token_counts == [[], [1, 3], [1, 3, 1, 3]]
+    assert len(sessions) == 0
+
+
+def test_session_reports_invalid_messages_and_goes_on():
+    with client.websocket_connect("/api/chatbot/ws/session") as websocket:
+        websocket.send_text("invalid json")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_json({"content": "a" * 501})
+        frame = websocket.receive_json()
+        assert frame["type"] == "error"
+        assert "content" in frame["detail"]
+        websocket.send_json({"content": "hola"})
+        assert receive_answer(websocket) == "Respuesta a hola"
+
+
+def test_session_closes_when_idle():
+    with client.websocket_connect("/api/chatbot/ws/session") as websocket:
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            websocket.receive_json()
+        assert disconnect.value.code == 1000
+    assert len(sessions) == 0
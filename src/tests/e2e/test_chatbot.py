@@ -1,16 +1,18 @@
+import pytest
 from fastapi import WebSocketDisconnect
 from fastapi.testclient import TestClient
 
 from src.api.app import create_app
 from src.api.deps import get_agent
 from src.core.agent import Agent
+from src.core.scheduler import SchedulerBusy
 
 
 class MockAgent(Agent):
     def __init__(self):
         pass
 
-    async def stream(self, query: str, history):
+    async def stream(self, query: str, history, token_counts=None):
         if query == "Error":
             raise Exception("Error processing query")
         chunks = ["Hello, ", "AI is ", "answering ", "here!"]
@@ -153,3 +155,21 @@ def test_websocket_content_and_history_too_long():
             assert "history" in response
         except WebSocketDisconnect as e:
             assert e.code == 1008
+
+
+def test_websocket_endpoint_closes_when_scheduler_is_busy():
+    class BusyAgent(MockAgent):
+        async def stream(self, query: str, history, token_counts=None):
+            raise SchedulerBusy()
+            yield
+
+    app.dependency_overrides[get_agent] = lambda: BusyAgent()
+    try:
+        with client.websocket_connect("/api/chatbot/ws") as websocket:
+            websocket.send_json({"content": "Hola", "history": []})
+            assert "ocupado" in websocket.receive_text()
+            with pytest.raises(WebSocketDisconnect) as disconnect:
+                websocket.receive_text()
+            assert disconnect.value.code == 1013
+    finally:
+        app.dependency_overrides[get_agent] = lambda: MockAgent()
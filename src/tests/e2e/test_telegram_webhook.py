@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from src.api.app import create_app
+from src.api.deps import get_telegram_queue
+from src.core.metrics import REGISTRY
+
+telegram_queue = MagicMock()
+
+app = create_app()
+app.dependency_overrides[get_telegram_queue] = lambda: telegram_queue
+
+
+client = TestClient(app)
+
+UPDATE = {"update_id": 1, "message": {"chat": {"id": 42}, "text": "Hola"}}
+
+
+def test_webhook_queues_update():
+    telegram_queue.reset_mock()
+    telegram_queue.submit.return_value = "queued"
+
+    response = client.post("/api/chatbot/webhook", json=UPDATE)
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "queued"}
+    telegram_queue.submit.assert_called_once_with(42, UPDATE)
+
+
+def test_webhook_sheds_load_when_queue_is_full():
+    telegram_queue.reset_mock()
+    telegram_queue.submit.return_value = "rejected"
+
+    response = client.post("/api/chatbot/webhook", json=UPDATE)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+def test_webhook_acknowledges_duplicated_updates():
+    telegram_queue.reset_mock()
+    telegram_queue.submit.return_value = "duplicate"
+
+    response = client.post("/api/chatbot/webhook", json=UPDATE)
+
+    assert response.status_code == 200
+    assert response.json() == {"status": "duplicate"}
+
+
+def test_webhook_ignores_updates_without_text():
+    telegram_queue.reset_mock()
+
+    response = client.post("/api/chatbot/webhook", json={"message": {"chat": {"id": 42}}})
+
+    assert response.status_code == 200
+    telegram_queue.submit.assert_not_called()
+
+
+def test_metrics_endpoint():
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert "# TYPE telegram_queue_depth gauge" in response.text
+
+
+def test_metrics_endpoint_is_hidden_when_disabled(monkeypatch):
+    monkeypatch.setattr(REGISTRY, "enabled", False)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 404
@@ -2,8 +2,11 @@ from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import HumanMessage
 
 from src.core.agent import Agent
+from src.core.response_cache import ResponseCache
+from src.core.scheduler import LLMScheduler
 
 
 @pytest.fixture
@@ -13,7 +16,9 @@ def mock_chat_model():
 
 @pytest.fixture
 def mock_context_manager():
-    return MagicMock()
+    context_manager = MagicMock()
+    context_manager.lookup_answer = AsyncMock(return_value=None)
+    return context_manager
 
 
 @pytest.fixture
@@ -113,3 +118,101 @@ async def test_stream_handles_empty_history(
 
     assert len(result) == 1
     assert result[0] == "message"
+
+
+@pytest.mark.asyncio
+async def test_stream_serves_cached_answer(mock_chat_model, mock_context_manager):
+    response_cache = ResponseCache(threshold=0.9)
+    agent = Agent(chat_model=mock_chat_model, context_manager=mock_context_manager, response_cache=response_cache)
+    mock_context_manager.embed_query = AsyncMock(return_value=[1.0, 0.0])
+    mock_context_manager.retrieve_context = AsyncMock(return_value=["Las elecciones ", "son el 17 de agosto"])
+
+    async def mock_stream(messages):
+        for msg in messages:
+            yield type("Chunk", (), {"content": msg})()
+
+    mock_chat_model.astream = mock_stream
+
+    first = [chunk async for chunk in agent.stream("¿Cuándo son las elecciones?", [])]
+    second = [chunk async for chunk in agent.stream("¿cuando son las elecciones?", [])]
+
+    assert mock_context_manager.retrieve_context.await_count == 1
+    assert "".join(second) == "".join(first) == "Las elecciones son el 17 de agosto"
+    assert len(second) > 1
+
+
+@pytest.mark.asyncio
+async def test_stream_skips_cache_with_history(mock_chat_model, mock_context_manager):
+    response_cache = ResponseCache(threshold=0.9)
+    agent = Agent(chat_model=mock_chat_model, context_manager=mock_context_manager, response_cache=response_cache)
+    mock_context_manager.embed_query = AsyncMock(return_value=[1.0, 0.0])
+    mock_context_manager.retrieve_context = AsyncMock(return_value=["respuesta"])
+
+    async def mock_stream(messages):
+        for msg in messages:
+            yield type("Chunk", (), {"content": msg})()
+
+    mock_chat_model.astream = mock_stream
+
+    history = [HumanMessage("hola")]
+    [chunk async for chunk in agent.stream("query", history)]
+    [chunk async for chunk in agent.stream("query", history)]
+
+    assert mock_context_manager.retrieve_context.await_count == 2
+    mock_context_manager.embed_query.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_stream_returns_direct_answer_without_llm(agent, mock_chat_model, mock_context_manager):
+    mock_context_manager.lookup_answer = AsyncMock(return_value="El voto es obligatorio.")
+    mock_context_manager.retrieve_context = AsyncMock()
+
+    result = [chunk async for chunk in agent.stream("¿Es obligatorio votar?", [])]
+
+    assert "".join(result) == "El voto es obligatorio."
+    mock_context_manager.retrieve_context.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_stream_drops_reasoning_split_across_chunks(
+    agent, mock_chat_model, mock_context_manager, mock_history
+):
+    mock_context_manager.retrieve_context = AsyncMock(return_value=[])
+
+    async def mock_stream(messages):
+        for content in ["<thi", "nk>pienso", "</th", "ink>Hola", " mundo"]:
+            yield type("Chunk", (), {"content": content})()
+
+    mock_chat_model.astream = mock_stream
+
+    result = [chunk async for chunk in agent.stream("consulta", mock_history)]
+
+    assert result == ["Hola", " mundo"]
+
+
+@pytest.mark.asyncio
+async def test_invoke_drops_reasoning(agent, mock_chat_model, mock_context_manager, mock_history):
+    mock_context_manager.retrieve_context = AsyncMock(return_value=[])
+    mock_chat_model.ainvoke = AsyncMock(return_value=MagicMock(content="<think>pienso</think>Hola"))
+
+    assert await agent.invoke("consulta", mock_history) == "Hola"
+
+
+@pytest.mark.asyncio
+async def test_stream_holds_a_scheduler_slot(mock_chat_model, mock_context_manager, mock_history):
+    scheduler = LLMScheduler(max_concurrency=1)
+    agent = Agent(chat_model=mock_chat_model, context_manager=mock_context_manager, scheduler=scheduler)
+    mock_context_manager.retrieve_context = AsyncMock(return_value=[])
+    active = []
+
+    async def mock_stream(messages):
+        active.append(scheduler.active)
+        yield type("Chunk", (), {"content": "Hola"})()
+
+    mock_chat_model.astream = mock_stream
+
+    result = [chunk async for chunk in agent.stream("consulta", mock_history, platform="telegram")]
+
+    assert result == ["Hola"]
+    assert active == [1]
+    assert scheduler.active == 0
@@ -0,0 +1,49 @@
+import json
+from collections import Counter
+
+import pytest
+
+from scripts.benchmark_retrieval import StubEmbeddings, benchmark_retrieval, synthetic_documents
+from src import ENV
+from src.consts import DocType
+
+
+def test_stub_embeddings_are_deterministic():
+    embeddings = StubEmbeddings(dimensions=32)
+
+    vector = embeddings.embed_query("fecha de las elecciones")
+
+    assert vector == StubEmbeddings(dimensions=32).embed_documents(["fecha de las elecciones"])[0]
+    assert sum(value * value for value in vector) == pytest.approx(1.0)
+
+
+def test_synthetic_documents_cover_every_type():
+    documents = list(synthetic_documents(60))
+
+    assert documents == list(synthetic_documents(60))
+    assert Counter(document.metadata["type"] for document in documents) == {
+        doc_type.value: 10 for doc_type in DocType
+    }
+    questions = [document for document in documents if document.metadata["type"] == DocType.Q_A.value]
+    assert all("answer" in document.metadata for document in questions)
+
+
+@pytest.mark.parametrize("backend", ["chroma", "numpy"])
+def test_benchmark_writes_report(tmp_path, word_encoding, backend):
+    settings = (ENV.retrieval.backend, ENV.retrieval.per_type_collections, ENV.chroma.persist_directory)
+    output = tmp_path / "report.json"
+
+    report = benchmark_retrieval(
+        sizes=[60], requests=10, clients=3, backend=backend, per_type_collections=True, output=str(output)
+    )
+
+    assert json.loads(output.read_text()) == report
+    assert report["settings"]["backend"] == backend
+    [result] = report["results"]
+    assert result["chunks"] == 60
+    assert result["disk_bytes"] > 0
+    assert result["retrieve_context"]["requests"] == 10
+    assert result["concurrent"]["requests"] == 10
+    assert result["concurrent"]["requests_per_second"] > 0
+    assert result["agent_stream"]["p99_ms"] >= result["agent_stream"]["p50_ms"]
+    assert (ENV.retrieval.backend, ENV.retrieval.per_type_collections, ENV.chroma.persist_directory) == settings
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from scripts.embedding_cache import SECONDS_PER_DAY, PersistentCachedEmbeddings, PersistentEmbeddingCache
+from src.tests.conftest import RecordingEmbeddings
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PersistentEmbeddingCache(str(tmp_path / "cache" / "embeddings.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_only_missing_texts_are_embedded_across_builds(cache, tmp_path):
+    model = RecordingEmbeddings(size=4)
+    first = PersistentCachedEmbeddings(model, cache=cache, model_name="model").embed_documents(["a", "b", "a"])
+    cache.close()
+
+    reopened = PersistentEmbeddingCache(cache.path)
+    second = PersistentCachedEmbeddings(model, cache=reopened, model_name="model").embed_documents(["b", "c", "a"])
+    reopened.close()
+
+    assert model.calls == [["a", "b"], ["c"]]
+    assert second[0] == pytest.approx(first[1], abs=1e-6)
+    assert second[2] == pytest.approx(first[0], abs=1e-6)
+    assert (reopened.hits, reopened.misses) == (2, 1)
+
+
+def test_vectors_are_keyed_by_model(cache):
+    cache.put_many("model", ["a"], [[1.0, 2.0]])
+
+    assert cache.get_many("model", ["a"]) == [[1.0, 2.0]]
+    assert cache.get_many("other-model", ["a"]) == [None]
+
+
+def test_report_and_prune(cache):
+    cache.put_many("model", ["a", "b"], [[1.0], [2.0]])
+    cache.put_many("other-model", ["a"], [[3.0]])
+    cache.connection.execute(
+        "UPDATE embeddings SET last_used_at = ? WHERE model = 'other-model'", (time.time() - 40 * SECONDS_PER_DAY,)
+    )
+
+    report = cache.report()
+    assert report["entries"] == 3
+    assert report["models"]["model"] == {"entries": 2, "vector_bytes": 8}
+    assert report["size_bytes"] > 0
+
+    assert cache.prune(30) == 1
+    assert cache.report()["models"].keys() == {"model"}
@@ -0,0 +1,271 @@
+import math
+from random import Random
+
+import chromadb
+import pytest
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage, trim_messages
+
+from src import ENV
+from src.agents.context_managers import chroma_cm
+from src.agents.context_managers.chroma_cm import ChromaContextManager, shared_embedding_cache
+from src.agents.context_managers.faq_index import FAQIndex, normalize_question
+from src.agents.context_managers.prompts import NOT_FOUND_PROMPT
+from src.agents.vector_stores.chroma_vs import ChromaVectorStore
+from src.agents.vector_stores.numpy_vs import NumpyVectorStore
+from src.agents.vector_stores.versions import new_version_directory, publish_version
+from src.consts import COLLECTION_NAME, DocType, type_collection_name
+
+VOCABULARY = ["elecciones", "fecha", "candidatos", "verificación", "falso", "programa", "votar"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """Deterministic embeddings that count vocabulary words and record every call."""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [float(text.count(word)) for word in VOCABULARY] + [0.1]
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def embeddings():
+    return KeywordEmbeddings()
+
+
+@pytest.fixture(params=["chroma", "numpy"])
+def context_manager(request, tmp_path, monkeypatch, embeddings):
+    monkeypatch.setattr(ENV.chroma, "persist_directory", str(tmp_path))
+    monkeypatch.setattr(ENV.retrieval, "backend", request.param)
+    documents = [
+        Document(page_content="fecha de las elecciones", metadata={"type": DocType.CALENDAR.value}),
+        Document(page_content="fecha para votar en las elecciones", metadata={"type": DocType.CALENDAR.value}),
+        Document(page_content="lista de candidatos", metadata={"type": DocType.CANDIDATES.value}),
+        Document(page_content="verificación falso", metadata={"type": DocType.VERIFICATIONS.value}),
+    ]
+    Chroma.from_documents(documents, embedding=KeywordEmbeddings(), persist_directory=str(tmp_path))
+    shared_embedding_cache().clear()
+    manager = ChromaContextManager(emb_model=embeddings)
+    yield manager
+    manager.client.close()
+
+
+@pytest.mark.asyncio
+async def test_build_system_messages_embeds_in_one_batch(context_manager, embeddings):
+    queries = [HumanMessage("Hola"), HumanMessage("Quiero votar"), HumanMessage("¿Cuál es la fecha de las elecciones?")]
+
+    system_messages = await context_manager.build_system_messages(queries)
+
+    assert len(embeddings.calls) == 1
+    assert embeddings.calls[0] == [
+        "¿cuál es la fecha de las elecciones?",
+        "quiero votar",
+        "hola",
+        "¿cuál es la fecha de las elecciones? quiero votar hola",
+    ]
+    assert "fecha de las elecciones" in str(system_messages[-1].content)
+
+
+@pytest.mark.asyncio
+async def test_build_system_messages_only_embeds_new_turns(context_manager, embeddings):
+    await context_manager.build_system_messages([HumanMessage("Hola")])
+    await context_manager.build_system_messages([HumanMessage("Hola"), HumanMessage("Quiero votar")])
+
+    assert embeddings.calls[-1] == ["quiero votar", "quiero votar hola"]
+
+
+@pytest.mark.asyncio
+async def test_build_system_messages_without_matches(context_manager):
+    not_found = chroma_cm.NOT_FOUND.value()
+
+    system_messages = await context_manager.build_system_messages([HumanMessage("Hola")])
+
+    assert system_messages[-1].content == NOT_FOUND_PROMPT
+    assert chroma_cm.NOT_FOUND.value() == not_found + 1
+
+
+@pytest.mark.asyncio
+async def test_build_system_messages_records_stage_metrics(context_manager):
+    stage = chroma_cm.STAGE_TIME
+    counts = {
+        "embedding": stage.count(stage="embedding"),
+        "classification_search": stage.count(stage="classification_search"),
+        "typed_search": stage.count(stage="typed_search", doc_type=DocType.CALENDAR.value),
+        "prompt_assembly": stage.count(stage="prompt_assembly"),
+    }
+    best_matches = chroma_cm.BEST_MATCH.value(doc_type=DocType.CALENDAR.value)
+
+    await context_manager.build_system_messages([HumanMessage("¿Cuál es la fecha de las elecciones?")])
+
+    assert stage.count(stage="embedding") == counts["embedding"] + 1
+    assert stage.count(stage="classification_search") == counts["classification_search"] + 1
+    assert stage.count(stage="typed_search", doc_type=DocType.CALENDAR.value) == counts["typed_search"] + 1
+    assert stage.count(stage="prompt_assembly") == counts["prompt_assembly"] + 1
+    assert chroma_cm.BEST_MATCH.value(doc_type=DocType.CALENDAR.value) == best_matches + 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("context_length", [0, 3, 8, 20, 1000])
+async def test_trim_context_matches_trim_messages(context_manager, word_encoding, monkeypatch, context_length):
+    monkeypatch.setattr(ENV.llm, "context_length", context_length)
+    random = Random(context_length)
+    message_types = [HumanMessage, AIMessage, ToolMessage]
+    for _ in range(50):
+        context: list[BaseMessage] = [SystemMessage("sistema")] if random.random() < 0.3 else []
+        for index in range(random.randint(0, 12)):
+            message_type = random.choice(message_types)
+            content = " ".join(random.choices(VOCABULARY, k=random.randint(1, 4)))
+            if message_type is ToolMessage:
+                context.append(ToolMessage(content, tool_call_id=str(index)))
+            else:
+                context.append(message_type(content))
+
+        expected = trim_messages(
+            context,
+            token_counter=lambda messages: sum(context_manager.count_tokens(message) for message in messages),
+            max_tokens=context_length,
+            strategy="last",
+            start_on="human",
+            end_on=("human", "tool"),
+            include_system=True,
+        )
+
+        assert await context_manager.trim_context(context) == expected
+        known = random.randint(0, len(context))
+        token_counts = [context_manager.count_tokens(message) for message in context[:known]]
+        assert await context_manager.trim_context(context, token_counts) == expected
+
+
+@pytest.mark.asyncio
+async def test_trim_context_uses_the_given_token_counts(context_manager, word_encoding, monkeypatch):
+    monkeypatch.setattr(ENV.llm, "context_length", 10)
+    history = [HumanMessage("fecha"), AIMessage("elecciones"), HumanMessage("votar"), AIMessage("programa")]
+    counted: list[BaseMessage] = []
+    count_tokens = context_manager.count_tokens
+    monkeypatch.setattr(
+        context_manager, "count_tokens", lambda message: counted.append(message) or count_tokens(message)
+    )
+
+    messages = await context_manager.trim_context([*history, HumanMessage("candidatos")], [20, 1, 2, 1])
+
+    assert [message.content for message in messages] == ["votar", "programa", "candidatos"]
+    assert [message.content for message in counted] == ["candidatos"]
+
+
+def test_normalize_question_ignores_accents_and_punctuation():
+    assert normalize_question("¿Cuándo   son las ELECCIONES?") == normalize_question("cuando son las elecciones")
+
+
+@pytest.mark.asyncio
+async def test_reload_switches_version_after_draining(context_manager, word_encoding, tmp_path):
+    directory = new_version_directory(str(tmp_path))
+    Chroma.from_documents(
+        [Document(page_content="programa de gobierno", metadata={"type": DocType.GOV_PROGRAMS.value})],
+        embedding=KeywordEmbeddings(),
+        persist_directory=directory,
+    )
+    assert not await context_manager.reload()
+
+    publish_version(str(tmp_path), directory)
+    closed = []
+    with context_manager._lease() as previous:
+        close = previous.close
+        previous.close = lambda: (closed.append(previous.directory), close())
+        assert await context_manager.reload()
+        assert not await context_manager.reload()
+        assert context_manager.index.directory == directory
+        assert closed == []
+    assert closed == [str(tmp_path)]
+
+    messages = await context_manager.retrieve_context("programa", [])
+    assert "programa de gobierno" in str(messages[1].content)
+
+
+@pytest.mark.asyncio
+async def test_faq_hit_skips_classification(context_manager, embeddings, word_encoding, monkeypatch):
+    context_manager.vectorDB.add_documents(
+        [
+            Document(
+                page_content="¿cómo voto?",
+                metadata={"type": DocType.Q_A.value, "answer": "Con tu carnet de identidad."},
+            )
+        ]
+    )
+    context_manager.index.faq_index = FAQIndex.from_vector_store(context_manager.vectorDB)
+    embeddings.calls.clear()
+
+    messages = await context_manager.retrieve_context("Como voto", [])
+
+    assert embeddings.calls == []
+    assert "Con tu carnet de identidad." in str(messages[1].content)
+    assert await context_manager.lookup_answer("Como voto") is None
+    monkeypatch.setattr(ENV.retrieval, "faq_skip_llm", True)
+    assert await context_manager.lookup_answer("¿Cómo voto?") == "Con tu carnet de identidad."
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine", "ip"])
+def test_numpy_store_matches_chroma(tmp_path, space):
+    random = Random(7)
+    documents = [
+        Document(page_content=f"documento {index}", metadata={"type": random.choice(list(DocType)).value})
+        for index in range(200)
+    ]
+    vectors = [[random.uniform(-1, 1) for _ in range(8)] for _ in documents]
+    vector_db = Chroma(
+        persist_directory=str(tmp_path),
+        collection_configuration={"hnsw": {"space": space}},
+        embedding_function=KeywordEmbeddings(),
+    )
+    vector_db._collection.add(
+        ids=[str(index) for index in range(len(documents))],
+        embeddings=vectors,
+        documents=[document.page_content for document in documents],
+        metadatas=[document.metadata for document in documents],
+    )
+    chroma_store = ChromaVectorStore(vector_db)
+    numpy_store = NumpyVectorStore.from_chroma(vector_db)
+    queries = [[random.uniform(-1, 1) for _ in range(8)] for _ in range(5)]
+
+    for doc_type in (None, DocType.CALENDAR.value):
+        for score_threshold in (None, 0.1):
+            expected = chroma_store.batch_search(queries, k=5, doc_type=doc_type, score_threshold=score_threshold)
+            result = numpy_store.batch_search(queries, k=5, doc_type=doc_type, score_threshold=score_threshold)
+            assert [[doc.page_content for doc in docs] for docs in result] == [
+                [doc.page_content for doc in docs] for docs in expected
+            ]
+
+
+def test_chroma_store_routes_typed_searches_to_type_collections(tmp_path):
+    embeddings = KeywordEmbeddings()
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    mixed = Chroma.from_documents(
+        [Document("fecha de las elecciones", metadata={"type": DocType.CALENDAR.value})],
+        embedding=embeddings,
+        collection_name=COLLECTION_NAME,
+        client=client,
+    )
+    calendar = Chroma.from_documents(
+        [Document("fecha para votar", metadata={"type": DocType.CALENDAR.value})],
+        embedding=embeddings,
+        collection_name=type_collection_name(DocType.CALENDAR),
+        client=client,
+    )
+    store = ChromaVectorStore(mixed, type_collections={DocType.CALENDAR.value: calendar})
+    query = embeddings.embed_query("fecha")
+
+    assert [doc.page_content for doc in store.search(query, k=5)] == ["fecha de las elecciones"]
+    assert [doc.page_content for doc in store.search(query, k=5, doc_type=DocType.CALENDAR.value)] == [
+        "fecha para votar"
+    ]
@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from scripts.chunking import Chunker
+
+
+def split_words(text: str) -> list[str]:
+    return [f"{os.getpid()}:{word}" for word in text.split()]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_chunker_keeps_input_order(workers):
+    items = [{"id": index, "body": " ".join(f"w{index}-{word}" for word in range(index % 4))} for index in range(50)]
+
+    with Chunker(workers, window_size=8, split_function=split_words) as chunker:
+        results = list(chunker.split(iter(items), lambda item: item["body"]))
+
+    assert [item for item, _ in results] == items
+    assert [[chunk.split(":", 1)[1] for chunk in chunks] for _, chunks in results] == [
+        item["body"].split() for item in items
+    ]
+    assert chunker.chunks == sum(index % 4 for index in range(50))
+    pids = {chunk.split(":", 1)[0] for _, chunks in results for chunk in chunks}
+    assert (str(os.getpid()) in pids) == (workers == 1)
+
+
+def test_chunker_rejects_invalid_worker_count():
+    with pytest.raises(ValueError):
+        Chunker(0)
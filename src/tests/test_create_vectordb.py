@@ -0,0 +1,226 @@
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import chromadb
+import pytest
+from chromadb.api.models.Collection import Collection
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from scripts import create_vectordb
+from scripts.chunking import Chunker
+from scripts.create_vectordb import (
+    content_hash,
+    deduplicate_ids,
+    document_id,
+    load_verifications,
+    stored_content_hashes,
+    sync_documents,
+)
+from scripts.type_collections import write_type_collections
+from src.agents.vector_stores.versions import (
+    VERSIONS_DIRECTORY,
+    new_version_directory,
+    prune_versions,
+    publish_version,
+    resolve_directory,
+)
+from src.consts import COLLECTION_NAME, DocType, type_collection_name
+from src.tests.conftest import RecordingEmbeddings
+
+
+def verification(key: str, body: str) -> dict:
+    return {"id": key, "title": f"Verificación {key}", "tags": ["falso"], "body": body}
+
+
+def build(vectordb: Chroma, records: list[dict]) -> dict[str, float]:
+    with Chunker(1, split_function=lambda text: text.split("|")) as chunker:
+        return sync_documents(vectordb, deduplicate_ids(load_verifications(records, chunker)), batch_size=2)
+
+
+def test_document_id_is_stable_per_source_record_and_chunk():
+    assert document_id(DocType.CALENDAR, "a", 1) == document_id(DocType.CALENDAR, "a", 1)
+    assert document_id(DocType.CALENDAR, "a", 1).startswith(f"{DocType.CALENDAR.value}:")
+    assert document_id(DocType.CALENDAR, "a", 0) != document_id(DocType.CALENDAR, "a", 1)
+    assert document_id(DocType.CALENDAR, "a") != document_id(DocType.CALENDAR, "b")
+
+
+def test_content_hash_covers_content_and_metadata():
+    document = Document("texto", metadata={"type": "calendar"})
+    hashed = Document("texto", metadata={"type": "calendar", "content_hash": content_hash(document)})
+
+    assert content_hash(hashed) == content_hash(document)
+    assert content_hash(Document("otro texto", metadata={"type": "calendar"})) != content_hash(document)
+    assert content_hash(Document("texto", metadata={"type": "candidates"})) != content_hash(document)
+
+
+def test_deduplicate_ids_numbers_repeated_keys():
+    documents = [Document("a", id="x"), Document("b", id="y"), Document("c", id="x"), Document("d", id="x")]
+
+    assert [document.id for document in deduplicate_ids(documents)] == ["x", "y", "x:1", "x:2"]
+
+
+def test_sync_documents_only_embeds_changes(tmp_path):
+    embeddings = RecordingEmbeddings(size=4)
+    vectordb = Chroma(collection_name=COLLECTION_NAME, persist_directory=str(tmp_path), embedding_function=embeddings)
+    records = [verification("1", "uno|dos"), verification("2", "tres"), verification("3", "cuatro")]
+
+    first = build(vectordb, records)
+    first_ids = set(vectordb.get()["ids"])
+    embeddings.calls.clear()
+    records = [verification("1", "uno|dos"), verification("2", "tres cambiado"), verification("4", "cinco")]
+    second = build(vectordb, records)
+
+    assert {key: first[key] for key in ("added", "updated", "deleted", "unchanged")} == {
+        "added": 4,
+        "updated": 0,
+        "deleted": 0,
+        "unchanged": 0,
+    }
+    assert {key: second[key] for key in ("added", "updated", "deleted", "unchanged")} == {
+        "added": 1,
+        "updated": 1,
+        "deleted": 1,
+        "unchanged": 2,
+    }
+    assert sorted(text for batch in embeddings.calls for text in batch) == ["cinco", "tres cambiado"]
+    ids = set(vectordb.get()["ids"])
+    assert {document_id(DocType.VERIFICATIONS, "1", index) for index in range(2)} <= first_ids & ids
+    assert document_id(DocType.VERIFICATIONS, "3") in first_ids - ids
+    assert document_id(DocType.VERIFICATIONS, "4") in ids - first_ids
+
+
+def test_sync_documents_keeps_ids_of_duplicate_source_keys(tmp_path):
+    embeddings = RecordingEmbeddings(size=4)
+    vectordb = Chroma(collection_name=COLLECTION_NAME, persist_directory=str(tmp_path), embedding_function=embeddings)
+    records = [verification("1", "primera"), verification("1", "segunda")]
+
+    first = build(vectordb, records)
+    second = build(vectordb, records)
+
+    key = document_id(DocType.VERIFICATIONS, "1")
+    assert sorted(vectordb.get()["ids"]) == [key, f"{key}:1"]
+    assert (first["added"], second["unchanged"], second["added"], second["deleted"]) == (2, 2, 0, 0)
+
+
+def test_stored_content_hashes_reads_every_page(tmp_path, monkeypatch):
+    vectordb = Chroma(
+        collection_name=COLLECTION_NAME, persist_directory=str(tmp_path), embedding_function=RecordingEmbeddings()
+    )
+    vectordb.add_documents(
+        [Document(id=f"doc-{index}", page_content="texto", metadata={"content_hash": str(index)}) for index in range(9)]
+    )
+    pages = []
+    get = Collection.get
+    monkeypatch.setattr(
+        Collection, "get", lambda self, **kwargs: pages.append(kwargs.get("limit")) or get(self, **kwargs)
+    )
+
+    hashes = stored_content_hashes(vectordb, batch_size=4)
+
+    assert hashes == {f"doc-{index}": str(index) for index in range(9)}
+    assert pages == [4, 4, 4, 4]
+
+
+def test_write_type_collections_copies_every_page(tmp_path, monkeypatch):
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    embeddings = DeterministicFakeEmbedding(size=4)
+    vectordb = Chroma(client=client, collection_name=COLLECTION_NAME, embedding_function=embeddings)
+    doc_types = [DocType.CALENDAR.value, DocType.CANDIDATES.value]
+    vectordb.add_documents(
+        [
+            Document(id=f"doc-{index}", page_content=f"documento {index}", metadata={"type": doc_types[index % 2]})
+            for index in range(25)
+        ]
+    )
+    pages = []
+    get = Collection.get
+    monkeypatch.setattr(
+        Collection, "get", lambda self, **kwargs: pages.append(kwargs.get("limit")) or get(self, **kwargs)
+    )
+
+    write_type_collections(client, batch_size=4)
+
+    assert set(pages) == {4}
+    copied = client.get_collection(type_collection_name(DocType.CALENDAR)).get(include=["embeddings"])
+    expected = vectordb.get(ids=copied["ids"], include=["embeddings"])
+    assert sorted(copied["ids"]) == sorted(f"doc-{index}" for index in range(0, 25, 2))
+    assert dict(zip(copied["ids"], map(list, copied["embeddings"]))) == dict(
+        zip(expected["ids"], map(list, expected["embeddings"]))
+    )
+    assert client.get_collection(type_collection_name(DocType.CANDIDATES)).count() == 12
+    assert client.get_collection(type_collection_name(DocType.Q_A)).count() == 0
+    client.close()
+
+
+@pytest.fixture
+def build_root(tmp_path, monkeypatch):
+    monkeypatch.setattr(create_vectordb.settings.chroma, "persist_directory", str(tmp_path))
+    monkeypatch.setattr(create_vectordb, "embedding", DeterministicFakeEmbedding(size=4))
+    return tmp_path
+
+
+def failing_documents(chunker: Chunker) -> Iterator[Document]:
+    yield Document("documento", id="doc-1", metadata={"type": DocType.CALENDAR.value})
+    raise RuntimeError("Datos corruptos")
+
+
+def test_failed_builds_never_replace_published_versions(build_root, monkeypatch):
+    documents = [Document("documento", id="doc-1", metadata={"type": DocType.CALENDAR.value})]
+    monkeypatch.setattr(create_vectordb, "load_documents", lambda chunker: iter(documents))
+    published = [create_vectordb.create_vectordb(workers=1) for _ in range(3)]
+
+    monkeypatch.setattr(create_vectordb, "load_documents", failing_documents)
+    for _ in range(4):
+        with pytest.raises(RuntimeError):
+            create_vectordb.create_vectordb(workers=1)
+
+    monkeypatch.setattr(create_vectordb, "load_documents", lambda chunker: iter(documents))
+    published.append(create_vectordb.create_vectordb(workers=1))
+
+    versions = build_root / VERSIONS_DIRECTORY
+    assert sorted(versions.iterdir()) == sorted(map(Path, published[1:]))
+    assert resolve_directory(str(build_root)) == published[-1]
+
+
+def test_changing_the_embedding_model_embeds_everything_again(build_root, monkeypatch):
+    documents = [
+        Document("documento", id="doc-1", metadata={"type": DocType.CALENDAR.value}),
+        Document("otro documento", id="doc-2", metadata={"type": DocType.CALENDAR.value}),
+    ]
+    monkeypatch.setattr(create_vectordb, "load_documents", lambda chunker: iter(documents))
+    monkeypatch.setattr(create_vectordb.settings.llm, "emb_model", "modelo-a")
+    create_vectordb.create_vectordb(workers=1, per_type_collections=True)
+
+    embeddings = RecordingEmbeddings(size=8)
+    monkeypatch.setattr(create_vectordb, "embedding", embeddings)
+    monkeypatch.setattr(create_vectordb.settings.llm, "emb_model", "modelo-b")
+    create_vectordb.create_vectordb(workers=1, per_type_collections=True)
+    directory = create_vectordb.create_vectordb(workers=1, per_type_collections=True)
+
+    assert embeddings.calls == [["documento", "otro documento"]]
+    client = chromadb.PersistentClient(path=directory)
+    collection = client.get_collection(COLLECTION_NAME)
+    assert collection.metadata["emb_model"] == "modelo-b"
+    assert len(collection.get(include=["embeddings"])["embeddings"][0]) == 8
+    assert client.get_collection(type_collection_name(DocType.CALENDAR)).count() == 2
+    client.close()
+
+
+def test_prune_versions_drops_interrupted_builds(tmp_path):
+    finished = []
+    for _ in range(3):
+        finished.append(new_version_directory(str(tmp_path)))
+        publish_version(str(tmp_path), finished[-1])
+    interrupted = new_version_directory(str(tmp_path))
+    publish_version(str(tmp_path), finished[1])
+    newer = new_version_directory(str(tmp_path))
+
+    deleted = prune_versions(str(tmp_path), keep=2)
+
+    assert deleted == [os.path.basename(finished[0])]
+    assert sorted(os.listdir(tmp_path / VERSIONS_DIRECTORY)) == sorted(
+        os.path.basename(path) for path in (finished[1], finished[2], interrupted, newer)
+    )
@@ -0,0 +1,53 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.api.deps import AgentPool
+
+
+@pytest.fixture
+def mock_create_agent():
+    def create_agent(**_):
+        return MagicMock(aclose=AsyncMock(), reload=AsyncMock(return_value=False))
+
+    with patch("src.api.deps.create_agent", side_effect=create_agent) as mock:
+        yield mock
+
+
+def test_agent_pool_builds_agents_once(mock_create_agent):
+    pool = AgentPool(size=2)
+
+    acquired = [pool.acquire() for _ in range(4)]
+
+    assert mock_create_agent.call_count == 2
+    assert acquired == [pool.agents[0], pool.agents[1], pool.agents[0], pool.agents[1]]
+
+
+def test_agent_pool_rejects_empty_size(mock_create_agent):
+    with pytest.raises(ValueError):
+        AgentPool(size=0)
+
+
+@pytest.mark.asyncio
+async def test_agent_pool_closes_every_agent(mock_create_agent):
+    pool = AgentPool(size=3)
+
+    await pool.aclose()
+
+    for agent in pool.agents:
+        agent.aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_agent_pool_reload_clears_response_cache(mock_create_agent):
+    pool = AgentPool(size=2)
+    pool.response_cache = MagicMock()
+
+    assert not await pool.reload()
+    pool.response_cache.invalidate.assert_not_called()
+
+    pool.agents[1].reload.return_value = True
+    assert await pool.reload()
+    for agent in pool.agents:
+        assert agent.reload.await_count == 2
+    pool.response_cache.invalidate.assert_called_once()
@@ -0,0 +1,67 @@
+from unittest.mock import patch
+
+import pytest
+
+from src.agents.context_managers.embedding_cache import CachedEmbeddings, EmbeddingCache
+from src.tests.conftest import RecordingEmbeddings
+
+
+@pytest.fixture
+def embeddings():
+    return RecordingEmbeddings(size=4)
+
+
+def test_cache_counts_hits_and_misses():
+    cache = EmbeddingCache()
+    key = cache.make_key("model", "Hola  Mundo")
+
+    assert cache.get(key) is None
+    cache.put(key, [1.0, 2.0])
+
+    assert cache.get(cache.make_key("model", "hola mundo")) == [1.0, 2.0]
+    assert cache.get(cache.make_key("other-model", "hola mundo")) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2)
+    first, second, third = (cache.make_key("model", text) for text in ("a", "b", "c"))
+    cache.put(first, [1.0])
+    cache.put(second, [2.0])
+    cache.get(first)
+    cache.put(third, [3.0])
+
+    assert cache.get(second) is None
+    assert cache.get(first) == [1.0]
+    assert cache.get(third) == [3.0]
+
+
+def test_cache_is_bounded_by_bytes():
+    key_size = len(EmbeddingCache.make_key("model", "a"))
+    cache = EmbeddingCache(max_bytes=2 * (key_size + 8 * 4))
+    for text in ("a", "b", "c"):
+        cache.put(cache.make_key("model", text), [0.0] * 4)
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_cache_expires_entries():
+    cache = EmbeddingCache(ttl=10)
+    key = cache.make_key("model", "a")
+    with patch("src.agents.context_managers.embedding_cache.time.monotonic", return_value=0):
+        cache.put(key, [1.0])
+    with patch("src.agents.context_managers.embedding_cache.time.monotonic", return_value=11):
+        assert cache.get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_cached_embeddings_only_embed_missing_texts(embeddings):
+    cached = CachedEmbeddings(embeddings, cache=EmbeddingCache(), model_name="fake")
+    first = await cached.aembed_documents(["hola", "adiós"])
+    second = await cached.aembed_documents(["hola", "nuevo", "nuevo"])
+
+    assert embeddings.calls == [["hola", "adiós"], ["nuevo"]]
+    assert second[0] == first[0]
+    assert second[1] == second[2]
@@ -0,0 +1,75 @@
+import asyncio
+
+import chromadb
+import httpx
+import openai
+import pytest
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from scripts.embedding_pipeline import embed_with_backoff, upsert_documents
+
+
+class FlakyEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that hit the rate limit on the first calls and track concurrency."""
+
+    failures: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    calls: int = 0
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+            raise openai.RateLimitError("rate limited", response=httpx.Response(429, request=request), body=None)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.embed_documents(texts)
+
+
+@pytest.mark.asyncio
+async def test_embed_with_backoff_retries_rate_limits():
+    embeddings = FlakyEmbeddings(size=4, failures=2)
+
+    vectors, retries = await embed_with_backoff(embeddings, ["a", "b"], base_delay=0)
+
+    assert len(vectors) == 2
+    assert retries == 2
+    assert embeddings.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_embed_with_backoff_gives_up():
+    embeddings = FlakyEmbeddings(size=4, failures=3)
+
+    with pytest.raises(openai.RateLimitError):
+        await embed_with_backoff(embeddings, ["a"], max_retries=2, base_delay=0)
+
+
+@pytest.mark.asyncio
+async def test_upsert_documents_in_concurrent_batches(tmp_path):
+    embeddings = FlakyEmbeddings(size=4, failures=1)
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    vectordb = Chroma(client=client, embedding_function=embeddings)
+    documents = [
+        Document(id=f"doc-{index}", page_content=f"documento {index}", metadata={"type": "calendar"})
+        for index in range(10)
+    ]
+
+    report = await upsert_documents(vectordb, documents, batch_size=3, concurrency=2, base_delay=0)
+
+    assert report["documents"] == 10
+    assert report["batches"] == 4
+    assert report["retries"] == 1
+    assert embeddings.max_in_flight == 2
+    stored = vectordb.get(ids=["doc-7"], include=["embeddings", "documents", "metadatas"])
+    assert stored["documents"] == ["documento 7"]
+    assert stored["metadatas"] == [{"type": "calendar"}]
+    assert list(stored["embeddings"][0]) == pytest.approx(embeddings.embed_query("documento 7"), abs=1e-6)
+    assert len(vectordb.get()["ids"]) == 10
+    client.close()
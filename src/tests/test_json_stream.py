@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from scripts.json_stream import iter_records, iter_sections
+
+DATA = {
+    "verifications": [
+        {"title": "Título con \"comillas\" y ñ", "body": "x" * 300, "tags": ["a", "b"]},
+        {"title": "Segundo", "body": "", "tags": []},
+    ],
+    "empty": [],
+    "calendar_metadata": {"title": "Calendario", "signatories": [{"name": "A", "position": "B"}]},
+    "count": 12345,
+    "questions_and_answers": [{"question": "¿Cuándo?", "answer": "Mañana"}],
+}
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "database.json"
+    path.write_text(json.dumps(DATA, ensure_ascii=False, indent=2), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_iter_records_matches_json_load(data_file, chunk_size):
+    records = list(iter_records(data_file, chunk_size=chunk_size))
+
+    assert records == [
+        ("verifications", DATA["verifications"][0]),
+        ("verifications", DATA["verifications"][1]),
+        ("calendar_metadata", DATA["calendar_metadata"]),
+        ("count", 12345),
+        ("questions_and_answers", DATA["questions_and_answers"][0]),
+    ]
+
+
+def test_iter_sections_groups_records_lazily(data_file):
+    sections = {section: list(records) for section, records in iter_sections(data_file, chunk_size=5)}
+
+    assert sections == {
+        "verifications": DATA["verifications"],
+        "calendar_metadata": [DATA["calendar_metadata"]],
+        "count": [12345],
+        "questions_and_answers": DATA["questions_and_answers"],
+    }
+
+
+def test_iter_records_rejects_truncated_files(tmp_path):
+    path = tmp_path / "database.json"
+    path.write_text('{"verifications": [{"title": "a"}, {"title": ', encoding="utf-8")
+
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_records(str(path), chunk_size=4))
@@ -0,0 +1,73 @@
+from src.core.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = Counter("requests_total", "Requests.", registry=registry)
+    depth = Gauge("queue_depth", "Queue depth.", registry=registry)
+    latency = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+
+    requests.inc(status="ok")
+    requests.inc(2, status='er"ror')
+    depth.inc()
+    depth.inc()
+    depth.dec()
+    latency.observe(0.1)
+    latency.observe(0.5)
+    latency.observe(3)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{status="er\\"ror"} 2.0',
+        'requests_total{status="ok"} 1.0',
+        "# HELP queue_depth Queue depth.",
+        "# TYPE queue_depth gauge",
+        "queue_depth 1.0",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 3.6",
+        "latency_seconds_count 3",
+    ]
+    assert latency.count() == 3
+    assert requests.value(status="ok") == 1
+
+
+def test_registry_rejects_duplicate_names():
+    registry = Registry()
+    Counter("requests_total", "Requests.", registry=registry)
+
+    try:
+        Counter("requests_total", "Requests.", registry=registry)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Expected a ValueError")
+
+
+def test_disabled_registry_records_nothing():
+    registry = Registry()
+    registry.enabled = False
+    requests = Counter("requests_total", "Requests.", registry=registry)
+    latency = Histogram("latency_seconds", "Latency.", registry=registry)
+
+    requests.inc()
+    with latency.time(stage="search"):
+        pass
+
+    assert requests.value() == 0
+    assert latency.count(stage="search") == 0
+
+
+def test_histogram_times_blocks():
+    registry = Registry()
+    latency = Histogram("latency_seconds", "Latency.", registry=registry)
+
+    with latency.time(stage="search"):
+        pass
+
+    assert latency.count(stage="search") == 1
+    assert latency.sum(stage="search") >= 0
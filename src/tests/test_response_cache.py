@@ -0,0 +1,47 @@
+from unittest.mock import patch
+
+from src.core.response_cache import ResponseCache, split_stream_chunks
+
+
+def test_lookup_returns_similar_answers_only():
+    cache = ResponseCache(threshold=0.9)
+    cache.store([1.0, 0.0], "17 de agosto")
+
+    assert cache.lookup([0.99, 0.05]) == "17 de agosto"
+    assert cache.lookup([0.0, 1.0]) is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+
+def test_store_evicts_least_recently_used():
+    cache = ResponseCache(threshold=0.99, max_entries=2)
+    cache.store([1.0, 0.0, 0.0], "a")
+    cache.store([0.0, 1.0, 0.0], "b")
+    cache.lookup([1.0, 0.0, 0.0])
+    cache.store([0.0, 0.0, 1.0], "c")
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0]) == "a"
+
+
+def test_answers_expire():
+    cache = ResponseCache(ttl=10)
+    with patch("src.core.response_cache.time.monotonic", return_value=0):
+        cache.store([1.0], "a")
+    with patch("src.core.response_cache.time.monotonic", return_value=11):
+        assert cache.lookup([1.0]) is None
+
+
+def test_invalidate_drops_every_answer():
+    cache = ResponseCache()
+    cache.store([1.0], "a")
+    assert cache.lookup([1.0]) == "a"
+
+    cache.invalidate()
+
+    assert cache.lookup([1.0]) is None
+
+
+def test_split_stream_chunks_keeps_text():
+    text = "Las elecciones\nson el **17 de agosto**. "
+
+    assert "".join(split_stream_chunks(text)) == text
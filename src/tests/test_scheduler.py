@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from src.core.scheduler import LLMScheduler, SchedulerBusy
+
+
+async def hold(scheduler: LLMScheduler, platform: str, release: asyncio.Event, started: list[str]) -> None:
+    async with scheduler.slot(platform):
+        started.append(platform)
+        await release.wait()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_concurrency():
+    scheduler = LLMScheduler(max_concurrency=2)
+    release = asyncio.Event()
+    started: list[str] = []
+
+    tasks = [asyncio.create_task(hold(scheduler, "web", release, started)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    assert len(started) == 2
+    assert scheduler.waiting == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert len(started) == 3
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serves_waiters_by_priority():
+    scheduler = LLMScheduler(max_concurrency=1)
+    release = asyncio.Event()
+    started: list[str] = []
+
+    running = asyncio.create_task(hold(scheduler, "web", release, started))
+    await asyncio.sleep(0)
+    waiting = [
+        asyncio.create_task(hold(scheduler, platform, release, started))
+        for platform in ("telegram", "whatsapp", "web")
+    ]
+    await asyncio.sleep(0.01)
+
+    release.set()
+    await asyncio.gather(running, *waiting)
+    assert started == ["web", "web", "whatsapp", "telegram"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_when_queue_is_full():
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=1)
+    release = asyncio.Event()
+    started: list[str] = []
+
+    tasks = [asyncio.create_task(hold(scheduler, "web", release, started)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    with pytest.raises(SchedulerBusy):
+        async with scheduler.slot("web"):
+            pass
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_after_the_deadline():
+    scheduler = LLMScheduler(max_concurrency=1, max_wait=0.01)
+    release = asyncio.Event()
+    started: list[str] = []
+
+    running = asyncio.create_task(hold(scheduler, "web", release, started))
+    await asyncio.sleep(0)
+    with pytest.raises(SchedulerBusy):
+        async with scheduler.slot("telegram"):
+            pass
+    assert scheduler.waiting == 0
+
+    release.set()
+    await running
+    async with scheduler.slot("web"):
+        assert scheduler.active == 1
+    assert scheduler.active == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_releases_the_slot_of_cancelled_waiters():
+    scheduler = LLMScheduler(max_concurrency=1)
+    release = asyncio.Event()
+    started: list[str] = []
+
+    running = asyncio.create_task(hold(scheduler, "web", release, started))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(hold(scheduler, "web", release, started))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    release.set()
+    await running
+    await asyncio.gather(cancelled, return_exceptions=True)
+
+    assert scheduler.active == 0
+    assert started == ["web"]
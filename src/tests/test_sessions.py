@@ -0,0 +1,73 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.api.sessions import SessionStore
+
+
+def turn(session, query: str, answer: str, tokens: int = 1) -> None:
+    session.add(HumanMessage(content=query), tokens)
+    session.add(AIMessage(content=answer), tokens)
+
+
+def test_session_keeps_the_latest_turns():
+    store = SessionStore(max_messages=4)
+    session = store.open()
+
+    for number in range(3):
+        turn(session, f"pregunta {number}", f"respuesta {number}")
+
+    assert [message.content for message in session.messages] == [
+        "pregunta 1",
+        "respuesta 1",
+        "pregunta 2",
+        "respuesta 2",
+    ]
+
+
+def test_session_history_is_bounded_by_tokens():
+    store = SessionStore(max_tokens=25)
+    session = store.open()
+
+    turn(session, "uno", "uno", tokens=10)
+    turn(session, "dos", "dos", tokens=10)
+
+    assert [message.content for message in session.messages] == ["dos", "dos"]
+    assert session.tokens == 20
+
+
+def test_store_caps_memory_across_sessions():
+    store = SessionStore(max_bytes=30)
+    idle = store.open()
+    active = store.open()
+
+    turn(idle, "a" * 10, "b" * 10)
+    turn(active, "c" * 10, "d" * 10)
+
+    assert len(idle) == 0
+    assert len(active) == 2
+    assert store.size == 20
+
+
+def test_session_trims_its_own_history_before_evicting_others():
+    store = SessionStore(max_messages=2, max_bytes=30)
+    idle = store.open()
+    active = store.open()
+
+    idle.add(HumanMessage(content="a" * 10), 1)
+    turn(active, "b" * 10, "c" * 10)
+    active.add(HumanMessage(content="d" * 10), 1)
+
+    assert len(idle) == 1
+    assert [message.content for message in active.messages] == ["d" * 10]
+    assert store.size == 20
+
+
+def test_closing_a_session_releases_its_history():
+    store = SessionStore()
+    session = store.open()
+    turn(session, "hola", "hola")
+
+    store.close(session)
+    store.close(session)
+
+    assert len(store) == 0
+    assert store.size == 0
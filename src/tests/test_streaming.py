@@ -0,0 +1,69 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+from src.api.streaming import coalesce_tokens
+
+
+async def chunks_of(*chunks: str, delay: float = 0):
+    for chunk in chunks:
+        await asyncio.sleep(delay)
+        yield chunk
+
+
+async def collect(chunks, **kwargs) -> list[str]:
+    async with aclosing(coalesce_tokens(chunks, **kwargs)) as frames:
+        return [frame async for frame in frames]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_size():
+    frames = await collect(chunks_of("ab", "", "cd", "ef", "g"), max_chars=4, max_delay=60)
+
+    assert frames == ["abcd", "efg"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_flushes_on_time():
+    frames = await collect(chunks_of("a", "b", "c", delay=0.05), max_chars=100, max_delay=0.01)
+
+    assert frames == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_sends_every_chunk_with_one_char_frames():
+    frames = await collect(chunks_of("a", "", "b"), max_chars=1)
+
+    assert frames == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_coalesce_raises_source_errors():
+    async def failing():
+        yield "a"
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await collect(failing(), max_chars=100, max_delay=60)
+
+
+@pytest.mark.asyncio
+async def test_coalesce_applies_backpressure_and_closes_the_source():
+    produced = []
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            for number in range(1000):
+                produced.append(number)
+                yield "x"
+        finally:
+            closed.set()
+
+    async with aclosing(coalesce_tokens(source(), max_chars=1, max_pending=4)) as frames:
+        await anext(frames)
+        await asyncio.sleep(0.01)
+        assert len(produced) <= 6
+
+    assert closed.is_set()
@@ -0,0 +1,309 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+from src.api.telegram import (
+    BUSY_REPLY,
+    REPLY_TIME,
+    MarkdownCleaner,
+    StreamedReply,
+    TelegramUpdateQueue,
+    UpdateDeduplicator,
+    answer_update,
+    close_bot,
+    create_bot,
+    limpiar_markdown,
+    stream_update,
+)
+from src.core.scheduler import SchedulerBusy
+
+
+def update(chat_id: int, text: str) -> dict:
+    return {"message": {"chat": {"id": chat_id}, "text": text}}
+
+
+def test_limpiar_markdown():
+    assert limpiar_markdown("## Título\n- **uno**\n- [dos](https://ejemplo.com)") == "Título\nuno\ndos"
+
+
+def test_markdown_cleaner_cleans_as_the_answer_grows():
+    cleaner = MarkdownCleaner()
+
+    assert cleaner.feed("## Tí") == "Tí"
+    assert cleaner.feed("tulo\n- **un") == "Título\nun"
+    assert cleaner.feed("o**\n- [dos](https://ejemplo.com)") == "Título\nuno\ndos"
+    assert cleaner.finish() == limpiar_markdown("## Título\n- **uno**\n- [dos](https://ejemplo.com)")
+
+
+def streaming_pool(chunks: list[str]) -> MagicMock:
+    async def stream(query, history, platform="web"):
+        assert platform == "telegram"
+        for chunk in chunks:
+            yield chunk
+
+    return MagicMock(acquire=MagicMock(return_value=MagicMock(stream=stream)))
+
+
+@pytest.mark.asyncio
+async def test_stream_update_sends_the_first_sentence_and_edits_it():
+    bot = MagicMock(send_message=AsyncMock(return_value=MagicMock(message_id=9)), edit_message_text=AsyncMock())
+    agent_pool = streaming_pool(["Los ", "**datos**", " son", " falsos.", " Fuente:", " [ABI](https://abi.bo)"])
+
+    await stream_update(update(42, "Hola"), agent_pool=agent_pool, bot=bot, edit_interval=0)
+
+    bot.send_message.assert_awaited_once_with(chat_id=42, text="Los datos son falsos.")
+    edits = [call.kwargs["text"] for call in bot.edit_message_text.await_args_list]
+    assert edits == ["Los datos son falsos. Fuente:", "Los datos son falsos. Fuente: ABI"]
+    assert all(call.kwargs["message_id"] == 9 for call in bot.edit_message_text.await_args_list)
+
+
+@pytest.mark.asyncio
+async def test_stream_update_throttles_edits():
+    bot = MagicMock(send_message=AsyncMock(return_value=MagicMock(message_id=9)), edit_message_text=AsyncMock())
+    agent_pool = streaming_pool(["Uno. ", "dos ", "tres ", "cuatro."])
+
+    await stream_update(update(42, "Hola"), agent_pool=agent_pool, bot=bot, edit_interval=0.2)
+
+    bot.send_message.assert_awaited_once_with(chat_id=42, text="Uno.")
+    bot.edit_message_text.assert_awaited_once_with(text="Uno. dos tres cuatro.", chat_id=42, message_id=9)
+
+
+@pytest.mark.asyncio
+async def test_streamed_reply_continues_long_text_in_new_messages():
+    bot = MagicMock(send_message=AsyncMock(side_effect=[MagicMock(message_id=1), MagicMock(message_id=2)]))
+    reply = StreamedReply(bot, chat_id=42, edit_interval=0)
+
+    await reply.finish("a" * 5000)
+
+    assert [len(call.kwargs["text"]) for call in bot.send_message.await_args_list] == [4096, 904]
+
+
+@pytest.mark.asyncio
+async def test_streamed_reply_waits_when_telegram_asks_to_slow_down():
+    bot = MagicMock(
+        send_message=AsyncMock(return_value=MagicMock(message_id=1)),
+        edit_message_text=AsyncMock(side_effect=[RetryAfter(0), None]),
+    )
+    reply = StreamedReply(bot, chat_id=42, edit_interval=0)
+
+    await reply.show("Uno.")
+    await reply.show("Uno. Dos.")
+    await reply.finish("Uno. Dos. Tres.")
+
+    assert [call.kwargs["text"] for call in bot.edit_message_text.await_args_list] == [
+        "Uno. Dos.",
+        "Uno. Dos. Tres.",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_streamed_reply_skips_edits_telegram_rejects():
+    bot = MagicMock(
+        send_message=AsyncMock(return_value=MagicMock(message_id=1)),
+        edit_message_text=AsyncMock(side_effect=[BadRequest("Message can't be edited"), None]),
+    )
+    reply = StreamedReply(bot, chat_id=42, edit_interval=0)
+
+    await reply.show("Uno.")
+    await reply.show("Uno. Dos.")
+    await reply.finish("Uno. Dos. Tres.")
+
+    assert bot.edit_message_text.await_args_list[-1].kwargs["text"] == "Uno. Dos. Tres."
+
+
+@pytest.mark.asyncio
+async def test_streamed_reply_deletes_messages_left_over_by_a_shorter_text():
+    bot = MagicMock(
+        send_message=AsyncMock(side_effect=[MagicMock(message_id=1), MagicMock(message_id=2)]),
+        edit_message_text=AsyncMock(),
+        delete_message=AsyncMock(),
+    )
+    reply = StreamedReply(bot, chat_id=42, edit_interval=0)
+
+    await reply.show("a" * 5000)
+    await reply.finish("b" * 100)
+
+    bot.edit_message_text.assert_awaited_once_with(text="b" * 100, chat_id=42, message_id=1)
+    bot.delete_message.assert_awaited_once_with(chat_id=42, message_id=2)
+
+
+@pytest.mark.asyncio
+async def test_stream_update_closes_the_stream_when_the_reply_fails():
+    closed = asyncio.Event()
+
+    async def stream(query, history, platform="web"):
+        try:
+            yield "Uno."
+            yield " Dos."
+        finally:
+            closed.set()
+
+    agent_pool = MagicMock(acquire=MagicMock(return_value=MagicMock(stream=stream)))
+    bot = MagicMock(send_message=AsyncMock(side_effect=RuntimeError("Sin conexión")))
+
+    with pytest.raises(RuntimeError):
+        await stream_update(update(42, "Hola"), agent_pool=agent_pool, bot=bot, edit_interval=0)
+
+    assert closed.is_set()
+
+
+@pytest.mark.asyncio
+async def test_answer_update_replies_with_the_shared_bot():
+    agent = MagicMock(invoke=AsyncMock(return_value="**Hola**"))
+    agent_pool = MagicMock(acquire=MagicMock(return_value=agent))
+    bot = MagicMock(send_message=AsyncMock())
+    replies = REPLY_TIME.count()
+
+    await answer_update(update(42, "Hola"), agent_pool=agent_pool, bot=bot)
+
+    agent.invoke.assert_awaited_once_with("Hola", [], platform="telegram")
+    bot.send_message.assert_awaited_once_with(chat_id=42, text="Hola")
+    assert REPLY_TIME.count() == replies + 1
+
+
+@pytest.mark.asyncio
+async def test_answer_update_tells_the_user_when_busy():
+    agent = MagicMock(invoke=AsyncMock(side_effect=SchedulerBusy()))
+    agent_pool = MagicMock(acquire=MagicMock(return_value=agent))
+    bot = MagicMock(send_message=AsyncMock())
+
+    await answer_update(update(42, "Hola"), agent_pool=agent_pool, bot=bot)
+
+    bot.send_message.assert_awaited_once_with(chat_id=42, text=BUSY_REPLY)
+
+
+@pytest.mark.asyncio
+async def test_bot_shares_one_connection_pool():
+    bot = create_bot("123:abc", pool_size=3)
+
+    assert bot.request is bot._request[0]
+    await close_bot(bot)
+    assert bot.request._client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_queue_keeps_chat_order():
+    answered: list[tuple[int, str]] = []
+
+    async def handler(update: dict) -> None:
+        await asyncio.sleep(0.01 if update["message"]["text"] == "1" else 0)
+        answered.append((update["message"]["chat"]["id"], update["message"]["text"]))
+
+    queue = TelegramUpdateQueue(handler, workers=2, queue_size=10)
+    queue.start()
+    for text in ("1", "2", "3"):
+        assert queue.submit(1, update(1, text)) == "queued"
+        assert queue.submit(2, update(2, text)) == "queued"
+    await queue.aclose()
+
+    assert [text for chat_id, text in answered if chat_id == 1] == ["1", "2", "3"]
+    assert [text for chat_id, text in answered if chat_id == 2] == ["1", "2", "3"]
+
+
+@pytest.mark.asyncio
+async def test_queue_rejects_updates_when_full():
+    release = asyncio.Event()
+
+    async def handler(update: dict) -> None:
+        await release.wait()
+
+    queue = TelegramUpdateQueue(handler, workers=1, queue_size=2)
+    queue.start()
+    assert queue.submit(1, update(1, "a")) == "queued"
+    await asyncio.sleep(0)
+    assert queue.submit(1, update(1, "b")) == "queued"
+    assert queue.submit(2, update(2, "c")) == "queued"
+    assert queue.submit(3, update(3, "d")) == "rejected"
+    assert queue.depth() == 2
+
+    release.set()
+    await queue.aclose()
+    assert queue.depth() == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_survives_handler_errors():
+    answered = []
+
+    async def handler(update: dict) -> None:
+        if update["message"]["text"] == "error":
+            raise RuntimeError("boom")
+        answered.append(update["message"]["text"])
+
+    queue = TelegramUpdateQueue(handler, workers=1, queue_size=5)
+    queue.start()
+    queue.submit(1, update(1, "error"))
+    queue.submit(1, update(1, "ok"))
+    await queue.aclose()
+
+    assert answered == ["ok"]
+
+
+@pytest.mark.asyncio
+async def test_queue_answers_duplicated_updates_once():
+    release = asyncio.Event()
+    answered = []
+
+    async def handler(update: dict) -> None:
+        await release.wait()
+        answered.append(update["update_id"])
+
+    queue = TelegramUpdateQueue(handler, workers=1, queue_size=5)
+    queue.start()
+    assert queue.submit(1, {"update_id": 7, **update(1, "a")}) == "queued"
+    assert queue.submit(1, {"update_id": 7, **update(1, "a")}) == "duplicate"
+
+    release.set()
+    await queue.aclose()
+    assert queue.submit(1, {"update_id": 7, **update(1, "a")}) == "duplicate"
+    assert answered == [7]
+
+
+@pytest.mark.asyncio
+async def test_queue_forgets_rejected_updates():
+    release = asyncio.Event()
+
+    async def handler(update: dict) -> None:
+        await release.wait()
+
+    queue = TelegramUpdateQueue(handler, workers=1, queue_size=1)
+    queue.start()
+    assert queue.submit(1, {"update_id": 1, **update(1, "a")}) == "queued"
+    await asyncio.sleep(0)
+    assert queue.submit(1, {"update_id": 2, **update(1, "b")}) == "queued"
+    assert queue.submit(1, {"update_id": 3, **update(1, "c")}) == "rejected"
+    assert queue.deduplicator.claim(3) is None
+
+    release.set()
+    await queue.aclose()
+
+
+@pytest.mark.asyncio
+async def test_deduplicator_attaches_duplicates_to_the_original():
+    deduplicator = UpdateDeduplicator()
+
+    assert deduplicator.claim(1) is None
+    original = deduplicator.claim(1)
+    assert original is not None and not original.done()
+
+    deduplicator.complete(1)
+    assert original.done()
+    assert deduplicator.claim(1).done()
+
+
+@pytest.mark.asyncio
+async def test_deduplicator_is_bounded_and_expires():
+    deduplicator = UpdateDeduplicator(max_entries=2)
+    for update_id in range(3):
+        deduplicator.claim(update_id)
+        deduplicator.complete(update_id)
+
+    assert len(deduplicator) == 2
+    assert deduplicator.claim(0) is None
+
+    expiring = UpdateDeduplicator(ttl=0)
+    expiring.claim(1)
+    expiring.complete(1)
+    assert expiring.claim(1) is None
@@ -0,0 +1,54 @@
+import pytest
+
+from src.core.think_filter import ThinkTagFilter
+
+
+def run(chunks: list[str]) -> tuple[list[str], int]:
+    think_filter = ThinkTagFilter()
+    outputs = [think_filter.feed(chunk) for chunk in chunks]
+    outputs.append(think_filter.flush())
+    return outputs, think_filter.dropped
+
+
+def test_plain_chunks_are_unchanged():
+    outputs, dropped = run(["Hola, ", "¿cómo estás? 3 < 4", " y 5 > 4"])
+
+    assert outputs == ["Hola, ", "¿cómo estás? 3 < 4", " y 5 > 4", ""]
+    assert dropped == 0
+
+
+def test_reasoning_is_dropped():
+    outputs, dropped = run(["<think>pienso", " mucho</think>", "Respuesta"])
+
+    assert "".join(outputs) == "Respuesta"
+    assert dropped == len("pienso mucho")
+
+
+@pytest.mark.parametrize("split", range(1, len("<think>razono</think>")))
+def test_tags_split_across_chunks_are_dropped(split):
+    text = "Antes <think>razono</think> después"
+    start = text.index("<think>")
+
+    outputs, dropped = run([text[: start + split], text[start + split :]])
+
+    assert "".join(outputs) == "Antes  después"
+    assert dropped == len("razono")
+
+
+def test_partial_tag_prefix_is_released_when_it_is_not_a_tag():
+    outputs, _ = run(["Texto <th", "ink de otra cosa", " <"])
+
+    assert outputs == ["Texto ", "<think de otra cosa", " ", "<"]
+
+
+def test_stray_closing_tag_is_removed():
+    outputs, _ = run(["razono</think>", "Respuesta"])
+
+    assert "".join(outputs) == "razonoRespuesta"
+
+
+def test_unclosed_reasoning_is_dropped():
+    outputs, dropped = run(["Hola <think>sin cerrar", " <"])
+
+    assert "".join(outputs) == "Hola "
+    assert dropped == len("sin cerrar <")